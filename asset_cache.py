@@ -0,0 +1,183 @@
+from collections import OrderedDict
+from threading import RLock
+
+import pygame
+from pygame import Surface
+from pygame.font import Font
+
+import game_settings as gs
+
+
+class AssetCache:
+    """Represents a shared cache of loaded images, fonts and rendered text."""
+    def __init__(self, text_cache_size: int=gs.TEXT_CACHE_SIZE) -> None:
+        """
+        Initialize an empty asset cache.
+
+        :param text_cache_size: the most rendered text surfaces kept.
+        """
+        self.images: dict[tuple[str,bool,float], Surface] = {}
+        self.fonts: dict[tuple[str,int], Font] = {}
+
+        # least recently used text is evicted first
+        self.texts: OrderedDict[tuple[Font,str,bool,tuple[int,int,int]],
+                                Surface] = OrderedDict()
+        self.text_cache_size: int = text_cache_size
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.text_hits: int = 0
+        self.text_misses: int = 0
+
+        # states may be built on a background thread while another is drawn
+        self.lock: RLock = RLock()
+
+        # the surface states draw onto, when it is not the display surface
+        self.frame: Surface | None = None
+        # a surface in the frame's channel order with per-pixel alpha
+        self.alpha_template: Surface | None = None
+
+
+    def image(self, path: str, alpha: bool=True, scale: float=1.0) -> Surface:
+        """
+        Return the image stored at a given path, loading it on first use.
+        Once a display mode or frame surface is set, images are converted to
+        its pixel format so that blits do not have to convert them every
+        frame.
+
+        :param path: the path of the image file.
+        :param alpha: whether the image keeps per-pixel transparency.
+        :param scale: the scale as a multiplier on the original image
+        dimensions.
+        :return: the shared surface, callers must not draw onto it.
+        """
+        with self.lock:
+            key: tuple[str,bool,float] = (path, alpha, scale)
+            image: Surface | None = self.images.get(key)
+            if image is not None:
+                self.hits += 1
+                return image
+
+            self.misses += 1
+            if scale != 1.0:
+                original: Surface = self.image(path, alpha)
+                size: tuple[int,int] = (int(original.get_width()*scale),
+                                        int(original.get_height()*scale))
+                image = pygame.transform.scale(original, size)
+            else:
+                image = pygame.image.load(path)
+                if pygame.display.get_surface() is not None:
+                    image = image.convert_alpha() if alpha \
+                        else image.convert()
+                elif self.frame is not None:
+                    image = image.convert(self.alpha_format()) if alpha \
+                        else image.convert(self.frame)
+
+            self.images[key] = image
+            return image
+
+
+    def alpha_format(self) -> Surface:
+        """
+        Return a 32-bit surface with per-pixel alpha whose colour channels
+        are laid out like the frame's, for converting transparent images
+        without a display mode. Blits of such images onto the frame then
+        only blend, without converting every pixel.
+
+        :return: the template surface.
+        """
+        masks: tuple[int, ...] = self.frame.get_masks()
+        if self.alpha_template is None or \
+                self.alpha_template.get_masks()[:3] != masks[:3]:
+            rgb: int = masks[0] | masks[1] | masks[2]
+            self.alpha_template = Surface((1, 1), pygame.SRCALPHA, 32,
+                                          masks[:3] + (0xFFFFFFFF & ~rgb,))
+        return self.alpha_template
+
+
+    def font(self, path: str, size: int) -> Font:
+        """
+        Return the font stored at a given path in a given size, opening it
+        on first use.
+
+        :param path: the path of the font file.
+        :param size: the point size.
+        :return: the shared font.
+        """
+        with self.lock:
+            key: tuple[str,int] = (path, size)
+            font: Font | None = self.fonts.get(key)
+            if font is None:
+                font = self.fonts[key] = Font(path, size)
+            return font
+
+
+    def text(self, font: Font, text: str, antialias: bool,
+             color: tuple[int,int,int]) -> Surface:
+        """
+        Return a rendered text surface, only rendering it again when the
+        same text has not been drawn recently.
+
+        :param font: a font returned by font().
+        :param text: the text to render.
+        :param antialias: whether the text has smooth edges.
+        :param color: the text colour.
+        :return: the shared surface, callers must not draw onto it.
+        """
+        with self.lock:
+            key: tuple[Font,str,bool,tuple[int,int,int]] = (font, text,
+                                                            antialias, color)
+            image: Surface | None = self.texts.get(key)
+            if image is not None:
+                self.text_hits += 1
+                self.texts.move_to_end(key)
+                return image
+
+            self.text_misses += 1
+            image = self.texts[key] = font.render(text, antialias, color)
+            if len(self.texts) > self.text_cache_size:
+                self.texts.popitem(last=False)
+            return image
+
+
+    def preload(self, manifest: list[tuple[str,bool]]) -> None:
+        """
+        Load every image in a manifest ahead of time.
+
+        :param manifest: pairs of image path and whether it keeps per-pixel
+        transparency.
+        """
+        for path, alpha in manifest:
+            self.image(path, alpha)
+
+
+    def memory_usage(self) -> int:
+        """
+        Return the pixel memory held by the cached images and text.
+
+        :return: the size in bytes.
+        """
+        return sum(image.get_pitch() * image.get_height()
+                   for images in (self.images, self.texts)
+                   for image in images.values())
+
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the cache statistics.
+
+        :return: the hit and miss counts, number of cached assets and memory
+        use.
+        """
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'text_hits': self.text_hits,
+                'text_misses': self.text_misses,
+                'images': len(self.images),
+                'fonts': len(self.fonts),
+                'texts': len(self.texts),
+                'bytes': self.memory_usage()}
+
+
+# shared by every state and widget
+assets: AssetCache = AssetCache()
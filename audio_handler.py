@@ -1,11 +1,59 @@
+import pygame
 from pygame.mixer import Sound
 
 
+class LazySound:
+    """
+    Represents a sound effect that is decoded after startup. Playing it
+    before it has been decoded, or without a mixer, does nothing.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Initialize a sound that has not been decoded yet.
+
+        :param path: the path of the sound file.
+        """
+        self.path: str = path
+        self.sound: Sound | None = None
+
+
+    def load(self) -> None:
+        """
+        Decode the sound file, if the mixer is available. A file that
+        cannot be decoded leaves the sound silent.
+        """
+        if self.sound is None and pygame.mixer.get_init():
+            try:
+                self.sound = Sound(self.path)
+            except (pygame.error, OSError):
+                pass # missing or damaged file
+
+
+    def play(self) -> None:
+        """
+        Play the sound once it has been decoded.
+        """
+        if self.sound is not None:
+            self.sound.play()
+
+
 class AudioHandler:
     """Represents an instance of the audio handler."""
     def __init__(self) -> None:
-        """Initializes an audio handler object."""
-        self.click_sfx: Sound = Sound("assets/audio/click3.mp3")
-        self.landed: Sound = Sound("assets/audio/landed.mp3")
-        self.full_line: Sound = Sound("assets/audio/full_line.mp3")
-        self.pause_click: Sound = Sound("assets/audio/click.mp3")
\ No newline at end of file
+        """
+        Initializes an audio handler object. Nothing is decoded until
+        load() is called, so it can run after the first frame is shown.
+        """
+        self.click_sfx: LazySound = LazySound("assets/audio/click3.mp3")
+        self.landed: LazySound = LazySound("assets/audio/landed.mp3")
+        self.full_line: LazySound = LazySound("assets/audio/full_line.mp3")
+        self.pause_click: LazySound = LazySound("assets/audio/click.mp3")
+
+
+    def load(self) -> None:
+        """
+        Decode every sound effect.
+        """
+        for sound in (self.pause_click, self.click_sfx, self.landed,
+                      self.full_line):
+            sound.load()
@@ -0,0 +1,577 @@
+"""
+Benchmark the game loop and rules hot paths without a real display.
+
+Run from the repository root so the assets can be found:
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare results.json
+
+Every benchmark reports per-call timings in microseconds as min, mean and
+the 50th, 90th and 99th percentiles.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tracemalloc
+from statistics import mean
+from time import perf_counter_ns
+from typing import Any, Callable
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from pygame import Rect, Surface
+from pygame.sprite import Group, Sprite
+
+import game_settings as gs
+from asset_cache import assets
+from engine.bot import Bot
+from engine.pieces import STATES, Piece
+from engine.randomizer import PieceGenerator
+from engine.rules import Action, TetrisEngine
+from engine.snapshot import Rewind, pack_state, unpack_state
+from engine.sync import BoardSync
+from main import Game
+from server import GameServer
+from states.main_game import Tetris, Tetronimo
+from states.main_menu import MainMenu
+
+
+def measure(func: Callable[[], Any], samples: int,
+            batch: int=1) -> dict[str, float]:
+    """
+    Time a function.
+
+    :param func: the function to call.
+    :param samples: the number of timings to take.
+    :param batch: calls per timing, for functions too fast to time singly.
+    :return: the timing summary in microseconds per call.
+    """
+    timings: list[float] = []
+    for _ in range(samples):
+        start: int = perf_counter_ns()
+        for _ in range(batch):
+            func()
+        timings.append((perf_counter_ns() - start) / batch / 1000)
+    return summarize(timings, batch)
+
+
+def summarize(timings: list[float], batch: int=1) -> dict[str, float]:
+    """
+    Summarize a list of timings.
+
+    :param timings: the timings in microseconds.
+    :param batch: the calls per timing.
+    :return: the timing summary.
+    """
+    timings.sort()
+    return {'samples': len(timings),
+            'batch': batch,
+            'min': timings[0],
+            'mean': mean(timings),
+            'p50': timings[len(timings) // 2],
+            'p90': timings[int(len(timings) * 0.9)],
+            'p99': timings[int(len(timings) * 0.99)],
+            'max': timings[-1]}
+
+
+def fill_board(engine: TetrisEngine, rows: int) -> None:
+    """
+    Fill the bottom rows of a board, leaving one gap per row so that none
+    of them clear.
+
+    :param engine: the engine whose board to fill.
+    :param rows: how many rows to fill.
+    """
+    board = engine.board
+    for y in range(board.height - rows, board.height):
+        gap: int = y % board.width
+        board.place([(x, y) for x in range(board.width) if x != gap], 1)
+
+
+def bench_frames(game: Game, samples: int) -> dict[str, Any]:
+    """
+    Time Tetris frames on boards of increasing fullness.
+
+    :param game: the game providing the screen and services.
+    :param samples: the number of frames to time per case.
+    :return: the results keyed by benchmark name.
+    """
+    results: dict[str, Any] = {}
+    for name, rows in (('empty', 0), ('half_full', gs.grid_height // 2),
+                       ('near_full', gs.grid_height - 4)):
+        tetris: Tetris = Tetris(game.screen, game.state_manager,
+                                game.audio_handler)
+        fill_board(tetris.engine, rows)
+        tetris.rebuild_stack()
+        tetris.run()
+
+        moves: list[Action] = [Action.LEFT, Action.RIGHT]
+
+        def moving_frame() -> None:
+            tetris.engine.step(moves[0])
+            moves.reverse()
+            tetris.run()
+
+        def full_frame() -> None:
+            tetris.redraw = True
+            tetris.run()
+
+        results[f'tetris_run_{name}'] = measure(moving_frame, samples)
+        results[f'tetris_redraw_{name}'] = measure(full_frame, samples)
+    return results
+
+
+def bench_rules(samples: int) -> dict[str, Any]:
+    """
+    Time the rules hot paths on a half-full board.
+
+    :param samples: the number of timings per benchmark.
+    :return: the results keyed by benchmark name.
+    """
+    engine: TetrisEngine = TetrisEngine(PieceGenerator(0))
+    fill_board(engine, gs.grid_height // 2)
+    state = STATES['T'][0]
+
+    def move() -> None:
+        engine.shift(-1, 0)
+        engine.shift(1, 0)
+
+    def clear_lines() -> None:
+        board = engine.board.copy()
+        for y in range(board.height - 4, board.height):
+            board.place([(x, y) for x in range(board.width)], 1)
+        board.clear_full_lines()
+
+    return {'piece_move': measure(move, samples, 100),
+            'piece_rotate': measure(engine.rotate, samples, 100),
+            'board_fits': measure(lambda: engine.board.fits(state, 4, 5),
+                                  samples, 100),
+            'clear_full_lines': measure(clear_lines, samples, 10)}
+
+
+def bench_screens(game: Game, samples: int) -> dict[str, Any]:
+    """
+    Time drawing the grid and the main menu.
+
+    :param game: the game providing the screen and services.
+    :param samples: the number of timings per benchmark.
+    :return: the results keyed by benchmark name.
+    """
+    tetris: Tetris = Tetris(game.screen, game.state_manager,
+                            game.audio_handler)
+    menu: MainMenu = MainMenu(game.screen, game.state_manager,
+                              game.audio_handler)
+
+    def menu_frame() -> None:
+        menu.redraw = True
+        menu.run()
+
+    return {'draw_grid': measure(lambda: tetris.draw_grid(game.screen),
+                                 samples),
+            'main_menu_run': measure(menu_frame, samples)}
+
+
+def bench_startup(samples: int) -> dict[str, Any]:
+    """
+    Time constructing the game with empty asset caches, and how long it
+    takes until the first frame is on screen.
+
+    :param samples: the number of timings.
+    :return: the results keyed by benchmark name.
+    """
+    first_frames: list[float] = []
+
+    def startup() -> None:
+        assets.__init__()
+        game: Game = Game()
+        first_frames.append(game.time_to_first_frame * 1_000_000)
+        # the game finishes loading in the background
+        game.loader.join()
+        game.state_manager.wait_for_prefetch()
+
+    return {'game_init': measure(startup, samples),
+            'time_to_first_frame': summarize(first_frames)}
+
+
+def bench_transitions(game: Game, samples: int) -> dict[str, Any]:
+    """
+    Time switching between the pooled menu and game states.
+
+    :param game: the game whose state manager to use.
+    :param samples: the number of timings per benchmark.
+    :return: the results keyed by benchmark name.
+    """
+    manager = game.state_manager
+    manager.wait_for_prefetch()
+
+    def menu_to_game() -> None:
+        manager.change_state('main_game')
+        manager.change_state('main_menu')
+
+    return {'menu_to_game_and_back': measure(menu_to_game, samples)}
+
+
+def bench_display(game: Game, samples: int) -> dict[str, Any]:
+    """
+    Time showing a frame with the configured display backend.
+
+    :param game: the game whose display to use.
+    :param samples: the number of timings per benchmark.
+    :return: the results keyed by benchmark name.
+    """
+    tile: list[pygame.Rect] = [pygame.Rect(gs.grid_start_x, gs.grid_start_y,
+                                           gs.tile_size, gs.tile_size)]
+    return {'present_tile': measure(lambda: game.display.present(tile),
+                                    samples),
+            'present_frame': measure(lambda: game.display.present(None),
+                                     samples)}
+
+
+def bench_effects(game: Game, samples: int) -> dict[str, Any]:
+    """
+    Time Tetris frames while a four-line clear and a game over burst throw
+    more particles than the draw budget over a near full board, and
+    measure the memory the particles still hold after those frames.
+
+    :param game: the game providing the screen and services.
+    :param samples: the number of frames to time.
+    :return: the results keyed by benchmark name.
+    """
+    tetris: Tetris = Tetris(game.screen, game.state_manager,
+                            game.audio_handler)
+    fill_board(tetris.engine, gs.grid_height - 4)
+    tetris.rebuild_stack()
+    tetris.run()
+
+    effects = tetris.effects
+    board = tetris.engine.board
+    rows: list[int] = list(range(board.height - 4, board.height))
+
+    def effects_frame() -> None:
+        # keep the pool past the budget
+        if effects.count < effects.budget:
+            effects.line_clear(rows, board.width)
+            effects.game_over(board)
+        effects.update()
+        tetris.run()
+
+    def frames() -> None:
+        for _ in range(samples):
+            effects_frame()
+
+    result: dict[str, Any] = measure(effects_frame, samples)
+    held, _ = allocated(frames)
+    result['budget'] = effects.budget
+    result['drawn_per_frame'] = effects.drawn / (2 * samples)
+    result['dropped'] = effects.dropped
+    result['bytes_per_frame'] = held / samples
+    return {'tetris_run_effects': result}
+
+
+def bench_bot(samples: int) -> dict[str, Any]:
+    """
+    Time the bot's placement decisions over a seeded game with the default
+    time budget. Each decision runs inside one logic tick.
+
+    :param samples: the number of decisions to time.
+    :return: the results keyed by benchmark name.
+    """
+    engine: TetrisEngine = TetrisEngine(PieceGenerator(5))
+    bot: Bot = Bot()
+
+    timings: list[float] = []
+    while len(timings) < samples:
+        if engine.game_over:
+            engine = TetrisEngine(PieceGenerator(len(timings)))
+            bot = Bot()
+        engine.tick(bot.next_action(engine))
+        if bot.decision_time:
+            timings.append(bot.decision_time * 1e6)
+            bot.decision_time = 0.0
+
+    results: dict[str, Any] = {'bot_decision': summarize(timings)}
+    results['bot_decision']['budget_ms'] = gs.BOT_BUDGET
+    results['bot_decision']['over_tick'] = sum(
+        timing > 1e6 / gs.tick_rate for timing in timings)
+    return results
+
+
+def bench_sync(samples: int) -> dict[str, Any]:
+    """
+    Time one tick of versus board sync, a packet each way between two
+    syncs, over a game the bot plays. The bot is not timed.
+
+    :param samples: the number of timings per benchmark.
+    :return: the results keyed by benchmark name.
+    """
+    engine: TetrisEngine = TetrisEngine(PieceGenerator(7))
+    bot: Bot = Bot(budget=None)
+    local: BoardSync = BoardSync(1)
+    remote: BoardSync = BoardSync(2)
+
+    timings: list[float] = []
+    for _ in range(samples):
+        engine.tick(bot.next_action(engine))
+        start: int = perf_counter_ns()
+        remote.decode(local.encode(engine))
+        local.decode(remote.encode(engine))
+        timings.append((perf_counter_ns() - start) / 1000)
+
+    results: dict[str, Any] = {'sync_tick': summarize(timings)}
+    results['sync_tick']['bytes_per_packet'] = local.bytes_sent / local.seq
+    return results
+
+
+def bench_snapshot(samples: int) -> dict[str, Any]:
+    """
+    Time saving and loading a game, and one rewind scrub step back through
+    a full history.
+
+    :param samples: the number of timings per benchmark.
+    :return: the results keyed by benchmark name.
+    """
+    engine: TetrisEngine = TetrisEngine(PieceGenerator(11))
+    bot: Bot = Bot(budget=None)
+    rewind: Rewind = Rewind()
+    for _ in range(rewind.capacity):
+        action: Action = bot.next_action(engine)
+        rewind.record(engine, action)
+        engine.tick(action)
+    history: int = rewind.memory_usage()
+    state: bytes = pack_state(engine)
+
+    results: dict[str, Any] = {
+        'save_state': measure(lambda: pack_state(engine), samples, 10),
+        'load_state': measure(lambda: unpack_state(engine, state), samples,
+                              10),
+        # each step shortens the history, which must outlast the samples
+        'rewind_step': measure(lambda: rewind.rewind(engine, 1),
+                               min(samples, rewind.capacity // 2))}
+    results['save_state']['bytes'] = len(state)
+    results['rewind_step']['history_bytes'] = history
+    return results
+
+
+def bench_server(samples: int, sessions: int=500) -> dict[str, Any]:
+    """
+    Time one server tick over many headless sessions, each given a random
+    action every few ticks, and work out how many sessions one core can
+    tick at the tick rate.
+
+    :param samples: the number of timings per benchmark.
+    :param sessions: the number of sessions ticked.
+    :return: the results keyed by benchmark name.
+    """
+    server: GameServer = GameServer()
+    for seed in range(sessions):
+        server.add_session(None, seed)
+    rng: random.Random = random.Random(0)
+    actions: list[Action] = [Action.LEFT, Action.RIGHT, Action.ROTATE,
+                             Action.DOWN]
+
+    def server_tick() -> None:
+        for session in server.sessions.values():
+            if rng.random() < 0.2:
+                session.actions.append(rng.choice(actions))
+        server.tick()
+        # keep the session count steady as games end
+        while len(server.sessions) < sessions:
+            server.add_session(None)
+
+    result: dict[str, Any] = measure(server_tick, samples)
+    per_session: float = result['p50'] / sessions
+    result['sessions'] = sessions
+    result['per_session_us'] = per_session
+    result['sessions_per_core'] = int(1e6 / gs.tick_rate / per_session)
+    return {'server_tick': result}
+
+
+def allocated(build: Callable[[], Any]) -> tuple[int, Any]:
+    """
+    Measure the Python memory allocated by a function and still held by
+    its result.
+
+    :param build: the function to call.
+    :return: the size in bytes and the result.
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result: Any = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(stat.size_diff for stat
+               in after.compare_to(before, 'filename')), result
+
+
+class SpriteBlock(Sprite):
+    """
+    Represents one block of a falling piece as the game drew it before the
+    Tetronimo view, kept as the baseline of bench_memory(): a sprite with
+    its own rect, group membership and references back to its piece.
+    """
+    def __init__(self, screen: Surface, group: Group, piece: Piece,
+                 image: Surface, index: int) -> None:
+        """
+        Initialize a block and add it to its piece's group.
+
+        :param screen: the game screen.
+        :param group: the sprite group of the piece.
+        :param piece: the engine piece the block belongs to.
+        :param image: the shared block image.
+        :param index: the index of the block within the piece offsets.
+        """
+        super().__init__(group)
+        self.screen: Surface = screen
+        self.piece: Piece = piece
+        self.index: int = index
+        self.image: Surface = image
+        self.rect: Rect = image.get_rect()
+        x, y = piece.offsets[index]
+        self.rect.topleft = ((piece.x + x) * gs.tile_size + gs.grid_start_x,
+                             (piece.y + y) * gs.tile_size + gs.grid_start_y)
+
+
+def bench_memory(game: Game, count: int=1000) -> dict[str, float]:
+    """
+    Measure the memory held per block, for the falling piece and for
+    landed blocks. Every falling piece gets its own engine piece, counted
+    with the view, and is also built as a group of sprite blocks to compare
+    against.
+
+    :param game: the game providing the screen.
+    :param count: how many pieces or boards to build.
+    :return: bytes per block keyed by measurement name.
+    """
+    engine: TetrisEngine = TetrisEngine(PieceGenerator(0))
+    tile = assets.image("assets/game/block.png")
+    shape: str = engine.piece.shape
+    blocks: int = len(engine.piece.offsets)
+
+    falling, _ = allocated(lambda: [Tetronimo(game.screen, tile,
+                                              Piece(shape))
+                                    for _ in range(count)])
+
+    def sprite_pieces() -> list:
+        pieces: list = []
+        for _ in range(count):
+            piece: Piece = Piece(shape)
+            group: Group = Group()
+            pieces.append((piece, group,
+                           [SpriteBlock(game.screen, group, piece, tile, idx)
+                            for idx in range(blocks)]))
+        return pieces
+
+    sprites, _ = allocated(sprite_pieces)
+
+    def full_boards() -> list:
+        boards: list = [engine.board.copy() for _ in range(count)]
+        for board in boards:
+            for y in range(board.height):
+                board.place([(x, y) for x in range(board.width)], 1)
+        return boards
+
+    landed, _ = allocated(full_boards)
+    return {'falling_block_bytes': falling / (count * blocks),
+            'sprite_block_bytes': sprites / (count * blocks),
+            'landed_block_bytes': landed / (count * engine.board.width
+                                            * engine.board.height)}
+
+
+def git_revision() -> str:
+    """
+    Return the current commit, if the benchmarks run inside a git checkout.
+
+    :return: the commit hash or an empty string.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"],
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: dict[str, Any], baseline_path: str,
+            threshold: float) -> bool:
+    """
+    Print how each benchmark changed against an earlier run.
+
+    :param results: the results of this run.
+    :param baseline_path: the json file of the earlier run.
+    :param threshold: the p50 slowdown ratio counted as a regression.
+    :return: whether any benchmark regressed.
+    """
+    with open(baseline_path) as file:
+        baseline: dict[str, Any] = json.load(file)['benchmarks']
+
+    regressed: bool = False
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio: float = result['p50'] / baseline[name]['p50']
+        flag: str = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"{name:28} {baseline[name]['p50']:10.2f} -> "
+              f"{result['p50']:10.2f} us  x{ratio:.2f}{flag}",
+              file=sys.stderr)
+    return regressed
+
+
+def main() -> int:
+    """
+    Run every benchmark and report the results.
+
+    :return: the exit status, 1 if a comparison found a regression.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=300)
+    parser.add_argument("--output", help="write the json here, not stdout")
+    parser.add_argument("--compare", help="json of an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    game: Game = Game()
+
+    benchmarks: dict[str, Any] = {}
+    benchmarks.update(bench_rules(args.samples))
+    benchmarks.update(bench_frames(game, args.samples))
+    benchmarks.update(bench_screens(game, args.samples))
+    benchmarks.update(bench_transitions(game, args.samples))
+    benchmarks.update(bench_display(game, args.samples))
+    benchmarks.update(bench_effects(game, args.samples))
+    benchmarks.update(bench_bot(args.samples))
+    benchmarks.update(bench_sync(args.samples))
+    benchmarks.update(bench_snapshot(args.samples))
+    benchmarks.update(bench_server(max(1, args.samples // 10)))
+    benchmarks.update(bench_startup(max(1, args.samples // 30)))
+
+    report: dict[str, Any] = {'commit': git_revision(),
+                              'python': platform.python_version(),
+                              'pygame': pygame.version.ver,
+                              'display': gs.DISPLAY_BACKEND,
+                              'benchmarks': benchmarks,
+                              'memory': bench_memory(game)}
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        return int(compare(benchmarks, args.compare, args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,14 @@
-import pygame
 from pygame import Surface, Rect
-from pygame.mixer import Sound
+
+from asset_cache import assets
+from audio_handler import LazySound
 
 
 class Button:
     """Represents an instance of the button class."""
     def __init__(self, surface: Surface, x: int, y: int, image: str, 
                  hover_image: str='', scale: float=1.0,
-                 click_sfx: Sound=None) -> None:
+                 click_sfx: LazySound=None) -> None:
         """
         Initialize a button object.
 
@@ -21,66 +22,31 @@ class Button:
         """
         self.surface: Surface = surface
 
-        self.sfx: Sound = click_sfx
+        self.sfx: LazySound = click_sfx
 
-        self.main_image: Surface = pygame.image.load(image)
-        
+        self.main_image: Surface = assets.image(image, scale=scale)
 
         if hover_image:
-            self.hover_image: Surface = pygame.image.load(hover_image)
+            self.hover_image: Surface = assets.image(hover_image, scale=scale)
         else:
             self.hover_image = None
 
-        self.scale_images(scale)
-
         self.image: Surface = self.main_image
 
         self.rect: Rect = self.image.get_rect(center=(x,y))
 
         self.button_clicked: bool = False
+        self.hovered: bool = False
 
 
-    def scale_images(self, scale: float) -> None:
-        """
-        Resize the button images according to the given scale.
-
-        :param scale: the desired scale as a multiplier on the original
-        image dimensions. A value of one results in the original image size.
-        """
-        self.main_image_width: int  = int(self.main_image.get_width() * scale)
-        self.main_image_height: int = int(self.main_image.get_height() * scale)
-
-        self.main_image_scaled: Surface = \
-            pygame.transform.scale(self.main_image, (self.main_image_width,
-                                                     self.main_image_height))
-        self.main_image = self.main_image_scaled
-
-        if self.hover_image:
-            self.hover_image_width: int  = int(self.hover_image.get_width() \
-                                               * scale)
-            self.hover_image_height: int = int(self.hover_image.get_height() \
-                                               * scale)
-
-            self.hover_image_scaled: Surface = \
-                pygame.transform.scale(self.hover_image, 
-                                       (self.hover_image_width,
-                                        self.hover_image_height))
-            self.hover_image = self.hover_image_scaled
-        
-
     def hover(self) -> None:
         """
         Display the appropriate image depending on whether the mouse is
-        hovering over the button or not.
+        hovering over the button or not, as last set by the owner of the
+        button from mouse events.
         Note: This method is called within the draw_button() method.
         """
-        pos: tuple[int,int] = pygame.mouse.get_pos()
-
-        if self.rect.collidepoint(pos) and self.image != self.hover_image:
-            self.image = self.hover_image
-
-        if not self.rect.collidepoint(pos) and self.image != self.main_image:
-            self.image = self.main_image
+        self.image = self.hover_image if self.hovered else self.main_image
 
 
     def draw_button(self) -> None:
@@ -92,31 +58,23 @@ class Button:
         self.surface.blit(self.image, self.rect)
 
 
-    def clicked(self) -> bool:
+    def press(self) -> None:
+        """
+        Register the left mouse button going down over the button.
+        """
+        if self.sfx:
+            self.sfx.play()
+        self.button_clicked = True
+
+
+    def release(self, pos: tuple[int,int]) -> bool:
         """
-        Check if the button has been clicked. The button registers as clicked
-        when the left mouse button is released and the mouse is hovering over
-        the button.
+        Register the left mouse button going up. The button registers as
+        clicked when it was pressed and the mouse is still over it.
 
+        :param pos: the mouse position of the release.
         :return: True -> clicked, False -> not clicked.
         """
-        
-        pos: tuple[int,int] = pygame.mouse.get_pos()
-
-        mouse_pressed = pygame.mouse.get_pressed()[0] == 1
-
-        if mouse_pressed and self.rect.collidepoint(pos) and \
-             not self.button_clicked:
-            if self.sfx:
-                self.sfx.play()
-            self.button_clicked = True
-
-        if not self.rect.collidepoint(pos):
-            self.button_clicked = False
-
-        if not mouse_pressed and self.button_clicked and \
-             self.rect.collidepoint(pos):
-            self.button_clicked = False
-            return True
-        
-        return False
\ No newline at end of file
+        pressed: bool = self.button_clicked
+        self.button_clicked = False
+        return pressed and self.rect.collidepoint(pos)
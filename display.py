@@ -0,0 +1,117 @@
+import pygame
+from pygame import Surface, Rect
+
+import game_settings as gs
+
+
+class SurfaceDisplay:
+    """
+    Represents a fixed-size window drawn with CPU blits straight onto the
+    display surface.
+    """
+    def __init__(self, size: tuple[int,int]) -> None:
+        """
+        Open the window.
+
+        :param size: the size of the window and of the frame drawn on it.
+        """
+        pygame.display.set_caption("Tetris")
+        self.screen: Surface = pygame.display.set_mode(size)
+        self.exposed: bool = False
+
+
+    def present(self, dirty: list[Rect] | None) -> None:
+        """
+        Show the areas of the frame that changed.
+
+        :param dirty: the changed areas, None -> the whole frame.
+        """
+        if dirty is None or self.exposed:
+            self.exposed = False
+            pygame.display.update()
+        elif dirty:
+            pygame.display.update(dirty)
+
+
+    def expose(self) -> None:
+        """
+        Show the whole frame again on the next present(), e.g. after the
+        window was uncovered.
+        """
+        self.exposed = True
+
+
+class TextureDisplay:
+    """
+    Represents a resizable window drawn through an SDL renderer. States draw
+    onto a frame surface of the game's own size as usual; the areas they
+    change are uploaded to one streaming texture, and the renderer scales
+    it to the window, letterboxed. Only changed pixels at game resolution
+    cross to the renderer, so the drawing cost does not depend on the
+    window size.
+    """
+    def __init__(self, size: tuple[int,int],
+                 window_size: tuple[int,int]) -> None:
+        """
+        Open the window and its renderer.
+
+        :param size: the size of the frame the states draw.
+        :param window_size: the initial size of the window.
+        """
+        # imported here so a pygame build without it falls back cleanly
+        from pygame._sdl2.video import Window, Renderer, Texture
+
+        self.window: Window = Window("Tetris", window_size, resizable=True)
+        self.renderer: Renderer = Renderer(self.window)
+        self.renderer.logical_size = size
+
+        self.screen: Surface = Surface(size)
+        self.texture: Texture = Texture(self.renderer, size, streaming=True)
+        self.frame_rect: Rect = self.screen.get_rect()
+        self.exposed: bool = False
+
+
+    def present(self, dirty: list[Rect] | None) -> None:
+        """
+        Upload the areas of the frame that changed and show the frame.
+
+        :param dirty: the changed areas, None -> the whole frame.
+        """
+        if dirty is None:
+            self.texture.update(self.screen)
+        elif dirty:
+            for rect in dirty:
+                rect = rect.clip(self.frame_rect)
+                if rect.width and rect.height:
+                    self.texture.update(self.screen.subsurface(rect), rect)
+        elif not self.exposed:
+            return
+
+        self.exposed = False
+        self.renderer.clear()
+        self.renderer.blit(self.texture)
+        self.renderer.present()
+
+
+    def expose(self) -> None:
+        """
+        Show the frame again on the next present(), e.g. after the window
+        was resized or uncovered.
+        """
+        self.exposed = True
+
+
+def create_display() -> SurfaceDisplay | TextureDisplay:
+    """
+    Open the game window with the backend in gs.DISPLAY_BACKEND, falling
+    back to the surface backend when the texture one is unavailable.
+
+    :return: the display.
+    """
+    size: tuple[int,int] = (gs.screen_width, gs.screen_height)
+    if gs.DISPLAY_BACKEND == "texture":
+        try:
+            return TextureDisplay(size, gs.WINDOW_SIZE)
+        except (ImportError, pygame.error):
+            pass
+    return SurfaceDisplay(size)
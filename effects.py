@@ -0,0 +1,267 @@
+import random
+from array import array
+from time import perf_counter
+
+import pygame
+from pygame import Surface, Rect
+
+import game_settings as gs
+from engine.board import Board
+
+
+# particle kinds, each with its own pre-rendered sprites
+SHARD: int = 0 # a piece of a cleared or destroyed block
+DUST: int = 1 # kicked up where a piece locks
+
+
+class Effects:
+    """
+    Represents the particles of the line clear, lock and game over effects,
+    kept in arrays allocated once: positions and velocities in pixels per
+    tick, remaining and total life in ticks and the kind of each particle.
+    Live particles are packed at the front of the arrays and a dead one is
+    replaced by the last, so spawning, moving and drawing never allocate
+    and a full pool drops new particles instead of growing.
+
+    Every sprite is pre-rendered at each fade level. At most budget
+    particles are drawn a frame: past that an evenly spaced subset is drawn,
+    shifted every frame, so a big burst flickers rather than stalls.
+    """
+    def __init__(self, tile: Surface, bounds: Rect,
+                 capacity: int=gs.PARTICLE_CAPACITY,
+                 budget: int=gs.PARTICLE_BUDGET,
+                 seed: int | None=None) -> None:
+        """
+        Initialize an empty particle pool.
+
+        :param tile: the block image shards are cut from.
+        :param bounds: the screen area particles live in, usually the field.
+        :param capacity: the most live particles.
+        :param budget: the most particles drawn a frame.
+        :param seed: the seed of the particle spread, random if omitted.
+        """
+        self.bounds: Rect = bounds
+        self.capacity: int = capacity
+        self.budget: int = budget
+        self.rng: random.Random = random.Random(seed)
+
+        self.x: array = array('f', bytes(4 * capacity))
+        self.y: array = array('f', bytes(4 * capacity))
+        self.vx: array = array('f', bytes(4 * capacity))
+        self.vy: array = array('f', bytes(4 * capacity))
+        self.life: array = array('H', bytes(2 * capacity))
+        self.max_life: array = array('H', bytes(2 * capacity))
+        self.kind: array = array('B', bytes(capacity))
+        self.count: int = 0
+
+        # sprites[kind][level], level 0 is the faintest
+        self.sprites: list[list[Surface]] = [
+            self.fade(pygame.transform.scale(tile, (gs.SHARD_SIZE,
+                                                    gs.SHARD_SIZE))),
+            self.fade(self.square(gs.DUST_SIZE, gs.WHITE))]
+
+        # debug counters, shown on the profiler overlay
+        self.spawned: int = 0
+        self.dropped: int = 0
+        self.drawn: int = 0
+        self.skipped: int = 0
+        self.draw_time: float = 0.0 # milliseconds, last frame
+        self.frame: int = 0
+
+
+    def square(self, size: int, color: tuple[int,int,int]) -> Surface:
+        """
+        Render a filled square.
+
+        :param size: the side length.
+        :param color: the fill colour.
+        :return: the square.
+        """
+        surface: Surface = Surface((size, size))
+        surface.fill(color)
+        return surface
+
+
+    def fade(self, sprite: Surface) -> list[Surface]:
+        """
+        Pre-render a sprite at every fade level.
+
+        :param sprite: the fully opaque sprite.
+        :return: the copies, faintest first.
+        """
+        levels: list[Surface] = []
+        for level in range(1, gs.PARTICLE_FADE_LEVELS + 1):
+            copy: Surface = sprite.copy()
+            copy.set_alpha(255 * level // gs.PARTICLE_FADE_LEVELS)
+            levels.append(copy)
+        return levels
+
+
+    def spawn(self, kind: int, x: float, y: float, vx: float, vy: float,
+              life: int) -> None:
+        """
+        Start a particle, or count it as dropped if the pool is full.
+
+        :param kind: SHARD or DUST.
+        :param x: the screen x position.
+        :param y: the screen y position.
+        :param vx: the horizontal speed in pixels per tick.
+        :param vy: the vertical speed in pixels per tick.
+        :param life: the ticks until it disappears.
+        """
+        if self.count == self.capacity:
+            self.dropped += 1
+            return
+        i: int = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.life[i] = life
+        self.max_life[i] = life
+        self.kind[i] = kind
+        self.count += 1
+        self.spawned += 1
+
+
+    def burst(self, kind: int, cells: list[tuple[int,int]], per_cell: int,
+              speed: float, life: int) -> None:
+        """
+        Throw particles out of the centre of grid cells.
+
+        :param kind: SHARD or DUST.
+        :param cells: the x and y grid coordinates.
+        :param per_cell: the particles per cell.
+        :param speed: the largest speed in pixels per tick.
+        :param life: the longest life in ticks.
+        """
+        uniform = self.rng.uniform
+        half: int = gs.tile_size // 2
+        for col, row in cells:
+            x: int = col * gs.tile_size + gs.grid_start_x + half
+            y: int = row * gs.tile_size + gs.grid_start_y + half
+            for _ in range(per_cell):
+                self.spawn(kind, x, y, uniform(-speed, speed),
+                           uniform(-speed, speed / 2),
+                           int(uniform(life / 2, life)))
+
+
+    def line_clear(self, rows: list[int], width: int) -> None:
+        """
+        Shatter cleared rows.
+
+        :param rows: the rows cleared, before the stack shifted down.
+        :param width: the number of columns.
+        """
+        self.burst(SHARD, [(col, row) for row in rows for col in range(width)],
+                   gs.LINE_CLEAR_PARTICLES, gs.PARTICLE_SPEED,
+                   gs.PARTICLE_LIFE)
+
+
+    def lock(self, cells: list[tuple[int,int]]) -> None:
+        """
+        Kick up dust under a piece that locked.
+
+        :param cells: the cells of the piece.
+        """
+        self.burst(DUST, cells, 1, gs.PARTICLE_SPEED / 3,
+                   gs.PARTICLE_LIFE // 2)
+
+
+    def game_over(self, board: Board) -> None:
+        """
+        Blow up every landed block.
+
+        :param board: the board of the finished game.
+        """
+        self.burst(SHARD, [(col, row) for row, mask in enumerate(board.rows)
+                           for col in range(board.width) if mask >> col & 1],
+                   gs.GAME_OVER_PARTICLES, gs.PARTICLE_SPEED * 1.5,
+                   gs.PARTICLE_LIFE * 2)
+
+
+    def update(self) -> None:
+        """
+        Advance every particle by one logic tick, removing those that died
+        or left the bounds.
+        """
+        x, y, vx, vy, life = self.x, self.y, self.vx, self.vy, self.life
+        left, top, right, bottom = self.bounds.left, self.bounds.top, \
+            self.bounds.right, self.bounds.bottom
+        gravity: float = gs.PARTICLE_GRAVITY
+
+        i: int = 0
+        while i < self.count:
+            life[i] -= 1
+            vy[i] += gravity
+            x[i] += vx[i]
+            y[i] += vy[i]
+            if life[i] and left <= x[i] < right and top <= y[i] < bottom:
+                i += 1
+                continue
+
+            # move the last live particle into the gap
+            last: int = self.count - 1
+            x[i] = x[last]
+            y[i] = y[last]
+            vx[i] = vx[last]
+            vy[i] = vy[last]
+            life[i] = life[last]
+            self.max_life[i] = self.max_life[last]
+            self.kind[i] = self.kind[last]
+            self.count = last
+
+
+    def draw(self, screen: Surface) -> bool:
+        """
+        Draw the particles within the frame budget, clipped to the bounds.
+
+        :param screen: the game screen.
+        :return: True -> particles were drawn, False -> there are none.
+        """
+        count: int = self.count
+        if not count:
+            self.draw_time = 0.0
+            return False
+        start: float = perf_counter()
+
+        # past the budget, every stride-th particle from a rotating offset
+        stride: int = -(-count // self.budget)
+        offset: int = self.frame % stride
+        self.frame += 1
+
+        x, y, life, max_life, kind = self.x, self.y, self.life, \
+            self.max_life, self.kind
+        sprites: list[list[Surface]] = self.sprites
+        levels: int = gs.PARTICLE_FADE_LEVELS
+        blit = screen.blit
+
+        clip: Rect = screen.get_clip()
+        screen.set_clip(self.bounds)
+        for i in range(offset, count, stride):
+            blit(sprites[kind[i]][life[i] * levels // (max_life[i] + 1)],
+                 (int(x[i]), int(y[i])))
+        screen.set_clip(clip)
+
+        drawn: int = len(range(offset, count, stride))
+        self.drawn += drawn
+        self.skipped += count - drawn
+        self.draw_time = (perf_counter() - start) * 1000
+        return True
+
+
+    def clear(self) -> None:
+        """
+        Remove every particle.
+        """
+        self.count = 0
+
+
+    def summary(self) -> str:
+        """
+        Return the debug counters as one line for the profiler overlay.
+
+        :return: the live, dropped and skipped particles and draw time.
+        """
+        return f"fx {self.count:3} drop {self.dropped} " \
+               f"skip {self.skipped} {self.draw_time:4.2f}ms"
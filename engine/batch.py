@@ -0,0 +1,287 @@
+"""
+Run many games in lockstep with NumPy. This module needs numpy, which the
+interactive game does not.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+import game_settings as gs
+from engine.pieces import KICKS, SHAPES, STATES
+from engine.randomizer import MODES, UNIFORM
+from engine.rules import Action
+
+
+def build_offsets() -> np.ndarray:
+    """
+    Stack the block offsets of every shape and orientation.
+
+    :return: an int array of shape (shapes, 4 rotations, blocks, 2).
+    """
+    return np.array([[state.offsets for state in STATES[shape]]
+                     for shape in SHAPES], dtype=np.int64)
+
+
+def build_kicks() -> np.ndarray:
+    """
+    Stack the kick tables of every shape, padding short tables by repeating
+    their last offset.
+
+    :return: an int array of shape (shapes, 4 rotations, kicks, 2).
+    """
+    length: int = max(len(kicks) for table in KICKS.values()
+                      for kicks in table)
+    return np.array([[list(kicks) + [kicks[-1]] * (length - len(kicks))
+                      for kicks in KICKS[shape]]
+                     for shape in SHAPES], dtype=np.int64)
+
+
+OFFSETS: np.ndarray = build_offsets()
+KICK_OFFSETS: np.ndarray = build_kicks()
+
+
+class BatchResult(NamedTuple):
+    """The outcome of one batch step, one entry per board."""
+    moved: np.ndarray
+    locked: np.ndarray
+    lines_cleared: np.ndarray
+    game_over: np.ndarray
+
+
+class BatchEngine:
+    """
+    Represents N independent games held as one boolean array of shape
+    (N, height, width). Every step applies one action per board, and the
+    collision tests, locks and line clears run as array operations across
+    all boards at once. The rules, shapes, kicks and scores are the same
+    as TetrisEngine.step().
+    """
+    def __init__(self, count: int, seed: int | None=None,
+                 mode: str=gs.PIECE_GENERATOR, width: int=gs.grid_width,
+                 height: int=gs.grid_height) -> None:
+        """
+        Initialize a batch of new games.
+
+        :param count: the number of boards.
+        :param seed: the seed of the shared random generator.
+        :param mode: the piece generator mode, UNIFORM or BAG.
+        :param width: the number of columns on each board.
+        :param height: the number of rows on each board.
+        """
+        if mode not in MODES:
+            raise ValueError(f"unknown piece generator mode: {mode}")
+
+        self.count: int = count
+        self.width: int = width
+        self.height: int = height
+        self.mode: str = mode
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        self.rows: np.ndarray = np.arange(height)
+
+        self.boards: np.ndarray = np.zeros((count, height, width), bool)
+        self.shape: np.ndarray = np.zeros(count, np.int64)
+        self.next_shape: np.ndarray = np.zeros(count, np.int64)
+        self.rotation: np.ndarray = np.zeros(count, np.int64)
+        self.x: np.ndarray = np.zeros(count, np.int64)
+        self.y: np.ndarray = np.zeros(count, np.int64)
+
+        self.score: np.ndarray = np.zeros(count, np.int64)
+        self.lines: np.ndarray = np.zeros(count, np.int64)
+        self.pieces: np.ndarray = np.zeros(count, np.int64)
+        self.game_over: np.ndarray = np.zeros(count, bool)
+
+        # a shuffled bag of shapes per board, for BAG mode
+        self.bags: np.ndarray = np.zeros((count, len(SHAPES)), np.int64)
+        self.bag_index: np.ndarray = np.full(count, len(SHAPES))
+
+        self.reset(np.ones(count, bool))
+
+
+    def reset(self, mask: np.ndarray) -> None:
+        """
+        Start new games on some boards.
+
+        :param mask: a boolean array selecting the boards to reset.
+        """
+        self.boards[mask] = False
+        self.score[mask] = 0
+        self.lines[mask] = 0
+        self.pieces[mask] = 0
+        self.game_over[mask] = False
+        self.bag_index[mask] = len(SHAPES)
+
+        self.shape[mask] = self.draw_shapes(mask)
+        self.next_shape[mask] = self.draw_shapes(mask)
+        self.spawn(mask)
+
+
+    def draw_shapes(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Return the next shape index for some boards.
+
+        :param mask: a boolean array selecting the boards.
+        :return: one index into SHAPES per selected board.
+        """
+        if self.mode == UNIFORM:
+            return self.rng.integers(0, len(SHAPES), int(mask.sum()))
+
+        empty: np.ndarray = mask & (self.bag_index == len(SHAPES))
+        if empty.any():
+            fresh: np.ndarray = np.tile(np.arange(len(SHAPES)),
+                                        (int(empty.sum()), 1))
+            self.bags[empty] = self.rng.permuted(fresh, axis=1)
+            self.bag_index[empty] = 0
+
+        indices: np.ndarray = np.flatnonzero(mask)
+        shapes: np.ndarray = self.bags[indices, self.bag_index[indices]]
+        self.bag_index[indices] += 1
+        return shapes
+
+
+    def spawn(self, mask: np.ndarray) -> None:
+        """
+        Move the current piece of some boards to the spawn position.
+
+        :param mask: a boolean array selecting the boards.
+        """
+        self.x[mask], self.y[mask] = gs.initial_offset
+        self.rotation[mask] = 0
+
+
+    def fits(self, mask: np.ndarray, x: np.ndarray, y: np.ndarray,
+             rotation: np.ndarray) -> np.ndarray:
+        """
+        Check whether the current piece of each board fits at a pose. Cells
+        above the top of the grid are free as long as they are within the
+        side walls.
+
+        :param mask: a boolean array selecting the boards to test.
+        :param x: the column of the first block, one per board.
+        :param y: the row of the first block, one per board.
+        :param rotation: the orientation, one per board.
+        :return: a boolean array, False for boards not selected.
+        """
+        indices: np.ndarray = np.flatnonzero(mask)
+        offsets: np.ndarray = OFFSETS[self.shape[indices],
+                                      rotation[indices]]
+        cells_x: np.ndarray = offsets[:, :, 0] + x[indices, None]
+        cells_y: np.ndarray = offsets[:, :, 1] + y[indices, None]
+
+        inside: np.ndarray = (cells_x >= 0) & (cells_x < self.width) & \
+            (cells_y < self.height)
+        occupied: np.ndarray = self.boards[indices[:, None],
+                                           np.clip(cells_y, 0,
+                                                   self.height - 1),
+                                           np.clip(cells_x, 0,
+                                                   self.width - 1)]
+        free: np.ndarray = inside & ~(occupied & (cells_y >= 0))
+
+        result: np.ndarray = np.zeros(self.count, bool)
+        result[indices] = free.all(axis=1)
+        return result
+
+
+    def step(self, actions: np.ndarray) -> BatchResult:
+        """
+        Apply one action to the current piece of every board.
+
+        :param actions: one Action value per board.
+        :return: what happened on each board.
+        """
+        actions = np.asarray(actions)
+        active: np.ndarray = ~self.game_over
+        moved: np.ndarray = np.zeros(self.count, bool)
+
+        for action, dx in ((Action.LEFT, -1), (Action.RIGHT, 1)):
+            mask: np.ndarray = active & (actions == action)
+            if mask.any():
+                ok: np.ndarray = self.fits(mask, self.x + dx, self.y,
+                                           self.rotation)
+                self.x[ok] += dx
+                moved |= ok
+
+        rotating: np.ndarray = active & (actions == Action.ROTATE)
+        if rotating.any():
+            turned: np.ndarray = (self.rotation + 1) % 4
+            kicks: np.ndarray = KICK_OFFSETS[self.shape, self.rotation]
+            for kick in range(kicks.shape[1]):
+                kx: np.ndarray = kicks[:, kick, 0]
+                ky: np.ndarray = kicks[:, kick, 1]
+                ok = self.fits(rotating, self.x + kx, self.y + ky, turned)
+                self.x[ok] += kx[ok]
+                self.y[ok] += ky[ok]
+                self.rotation[ok] = turned[ok]
+                moved |= ok
+                rotating &= ~ok
+
+        locking: np.ndarray = np.zeros(self.count, bool)
+
+        down: np.ndarray = active & (actions == Action.DOWN)
+        if down.any():
+            ok = self.fits(down, self.x, self.y + 1, self.rotation)
+            self.y[ok] += 1
+            moved |= ok
+            locking |= down & ~ok
+
+        dropping: np.ndarray = active & (actions == Action.DROP)
+        locking |= dropping
+        while dropping.any():
+            ok = self.fits(dropping, self.x, self.y + 1, self.rotation)
+            self.y[ok] += 1
+            moved |= ok
+            dropping = ok
+
+        lines: np.ndarray = np.zeros(self.count, np.int64)
+        if locking.any():
+            lines = self.lock(locking)
+
+        return BatchResult(moved, locking, lines, self.game_over.copy())
+
+
+    def lock(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Store the current piece of some boards, clear completed rows and
+        spawn the next pieces. A board's game is over when its piece locks
+        with any block above the top of the grid.
+
+        :param mask: a boolean array selecting the boards.
+        :return: the rows cleared on each board.
+        """
+        indices: np.ndarray = np.flatnonzero(mask)
+        offsets: np.ndarray = OFFSETS[self.shape[indices],
+                                      self.rotation[indices]]
+        cells_x: np.ndarray = offsets[:, :, 0] + self.x[indices, None]
+        cells_y: np.ndarray = offsets[:, :, 1] + self.y[indices, None]
+
+        over: np.ndarray = (cells_y < 0).any(axis=1)
+        self.game_over[indices[over]] = True
+
+        indices = indices[~over]
+        cells_x = cells_x[~over]
+        cells_y = cells_y[~over]
+        self.boards[indices[:, None], cells_y, cells_x] = True
+        self.score[indices] += gs.PIECE_SCORE
+        self.pieces[indices] += 1
+
+        # stable sort full rows to the top, then empty them
+        boards: np.ndarray = self.boards[indices]
+        full: np.ndarray = boards.all(axis=2)
+        cleared: np.ndarray = full.sum(axis=1)
+        if cleared.any():
+            order: np.ndarray = np.argsort(~full, axis=1, kind='stable')
+            boards = np.take_along_axis(boards, order[:, :, None], axis=1)
+            boards[self.rows[None, :] < cleared[:, None]] = False
+            self.boards[indices] = boards
+
+        self.score[indices] += cleared * gs.LINE_SCORE
+        self.lines[indices] += cleared
+
+        spawned: np.ndarray = np.zeros(self.count, bool)
+        spawned[indices] = True
+        self.shape[spawned] = self.next_shape[spawned]
+        self.next_shape[spawned] = self.draw_shapes(spawned)
+        self.spawn(spawned)
+
+        lines: np.ndarray = np.zeros(self.count, np.int64)
+        lines[indices] = cleared
+        return lines
@@ -0,0 +1,146 @@
+import game_settings as gs
+from engine.pieces import SHAPES, RotationState
+
+
+# the id stored for garbage blocks, after the shape ids
+GARBAGE_ID: int = len(SHAPES) + 1
+
+
+class Board:
+    """
+    Represents the playing field as one integer bitmask per row, where bit
+    x of a row is set when column x holds a landed block. The shape id of
+    each landed block is kept separately for rendering.
+    """
+    def __init__(self, width: int=gs.grid_width,
+                 height: int=gs.grid_height) -> None:
+        """
+        Initialize an empty board.
+
+        :param width: the number of columns.
+        :param height: the number of rows.
+        """
+        self.width: int = width
+        self.height: int = height
+        self.full_row: int = (1 << width) - 1
+
+        # row-major, index 0 is the top row
+        self.rows: list[int] = [0] * height
+
+        # render data, 0 -> empty, otherwise the id of the landed shape
+        self.colors: list[bytearray] = [bytearray(width)
+                                        for _ in range(height)]
+
+        # the rows removed by the last clear, before the stack shifted down
+        self.cleared_rows: list[int] = []
+
+
+    def is_free(self, x: int, y: int) -> bool:
+        """
+        Check whether a piece may occupy a given cell. Cells above the top
+        of the grid are free as long as they are within the side walls.
+
+        :param x: the column.
+        :param y: the row.
+        :return: True -> free, False -> wall, floor or landed block.
+        """
+        return 0 <= x < self.width and y < self.height and \
+            (y < 0 or not self.rows[y] >> x & 1)
+
+
+    def fits(self, state: RotationState, x: int, y: int) -> bool:
+        """
+        Check whether a piece orientation fits at a given position. Each
+        occupied row of the piece is tested with a single mask compare.
+
+        :param state: the precomputed orientation of the piece.
+        :param x: the column of the first block.
+        :param y: the row of the first block.
+        :return: True -> all cells free, False -> any collision.
+        """
+        left: int = x + state.min_x
+        if left < 0 or x + state.max_x >= self.width or \
+                y + state.max_y >= self.height:
+            return False
+
+        rows: list[int] = self.rows
+        for dy, mask in state.rows:
+            row: int = y + dy
+            if row >= 0 and rows[row] & mask << left:
+                return False
+        return True
+
+
+    def place(self, cells: list[tuple[int,int]], value: int) -> None:
+        """
+        Store landed cells on the board.
+
+        :param cells: the x and y grid coordinates to fill.
+        :param value: the non-zero id written to each cell.
+        """
+        for x,y in cells:
+            self.rows[y] |= 1 << x
+            self.colors[y][x] = value
+
+
+    def clear_full_lines(self, rows: list[int] | None=None) -> int:
+        """
+        Remove every completed row and shift the rows above it down.
+
+        :param rows: the only rows that may have been completed, usually the
+        rows of the piece that just locked. All rows are checked if omitted.
+        :return: the number of rows cleared.
+        """
+        if rows is None:
+            rows = range(self.height)
+
+        full: list[int] = sorted({y for y in rows
+                                  if self.rows[y] == self.full_row})
+        self.cleared_rows = full
+
+        for y in full:
+            del self.rows[y]
+            del self.colors[y]
+            self.rows.insert(0, 0)
+            self.colors.insert(0, bytearray(self.width))
+
+        return len(full)
+
+
+    def add_garbage(self, lines: int, hole: int) -> bool:
+        """
+        Push the rows up and fill the bottom with garbage rows, each full
+        except for one column.
+
+        :param lines: the number of garbage rows.
+        :param hole: the empty column of every garbage row.
+        :return: True -> landed blocks were pushed off the top, False -> not.
+        """
+        lines = min(lines, self.height)
+        overflow: bool = any(self.rows[:lines])
+        del self.rows[:lines]
+        del self.colors[:lines]
+
+        row: int = self.full_row & ~(1 << hole)
+        for _ in range(lines):
+            self.rows.append(row)
+            colors: bytearray = bytearray([GARBAGE_ID]) * self.width
+            colors[hole] = 0
+            self.colors.append(colors)
+        return overflow
+
+
+    def copy(self) -> "Board":
+        """
+        Return an independent copy of the board.
+
+        :return: the copy.
+        """
+        board: Board = Board.__new__(Board)
+        board.width = self.width
+        board.height = self.height
+        board.full_row = self.full_row
+        board.rows = self.rows.copy()
+        board.colors = [bytearray(row) for row in self.colors]
+        board.cleared_rows = []
+        return board
@@ -0,0 +1,347 @@
+from collections import OrderedDict, deque
+from time import perf_counter
+from typing import Callable
+
+import game_settings as gs
+from engine.board import Board
+from engine.pieces import KICKS, STATES, RotationState
+from engine.rules import Action, TetrisEngine
+
+
+# a piece position as x, y and rotation
+Pose = tuple[int,int,int]
+
+# weights of the default board evaluation
+HEIGHT_WEIGHT: float = -0.51
+LINES_WEIGHT: float = 0.76
+HOLES_WEIGHT: float = -0.36
+BUMPINESS_WEIGHT: float = -0.18
+
+
+def evaluate_board(board: Board, lines: int) -> float:
+    """
+    Score a board after a placement, higher is better.
+
+    :param board: the board with the piece placed and full rows cleared.
+    :param lines: the number of rows the placement cleared.
+    :return: the weighted sum of aggregate height, lines, holes and
+    bumpiness.
+    """
+    heights: list[int] = [0] * board.width
+    holes: int = 0
+    covered: int = 0
+
+    for y, row in enumerate(board.rows):
+        # columns whose highest block is on this row
+        tops: int = row & ~covered
+        while tops:
+            lowest: int = tops & -tops
+            heights[lowest.bit_length() - 1] = board.height - y
+            tops ^= lowest
+        holes += (covered & ~row).bit_count()
+        covered |= row
+
+    bumpiness: int = sum(abs(a - b) for a,b in zip(heights, heights[1:]))
+    return HEIGHT_WEIGHT * sum(heights) + LINES_WEIGHT * lines + \
+        HOLES_WEIGHT * holes + BUMPINESS_WEIGHT * bumpiness
+
+
+def build_bottoms(state: RotationState) -> tuple[tuple[int,int], ...]:
+    """
+    Return the lowest block offset in each column of a piece orientation.
+
+    :param state: the orientation.
+    :return: pairs of column offset and lowest row offset.
+    """
+    bottoms: dict[int, int] = {}
+    for x,y in state.offsets:
+        bottoms[x] = max(y, bottoms.get(x, y))
+    return tuple(bottoms.items())
+
+
+# lookahead placements are plain drops, so only distinct orientations matter
+DROP_STATES: dict[str, tuple[tuple[int, RotationState,
+                                   tuple[tuple[int,int], ...]], ...]] = \
+    {shape: tuple((rotation, state, build_bottoms(state))
+                  for rotation, state in enumerate(states)
+                  if state.offsets not in
+                  [other.offsets for other in states[:rotation]])
+     for shape, states in STATES.items()}
+
+
+class Bot:
+    """
+    Represents a computer player. It searches every reachable final
+    placement of the current piece, scores each one by the best drop of the
+    next piece on the resulting board, and then feeds the engine the moves
+    to get there one action at a time. A decision runs inside one logic
+    tick, so the search and the lookahead stop once the time budget is
+    spent and the best placement found so far is taken.
+    """
+    def __init__(self, evaluate: Callable[[Board, int], float]=evaluate_board,
+                 lookahead: bool=True, candidates: int=8,
+                 cache_size: int=32,
+                 budget: int | None=gs.BOT_BUDGET) -> None:
+        """
+        Initialize a bot.
+
+        :param evaluate: scores a board given the lines cleared to reach it.
+        :param lookahead: whether to consider the next piece.
+        :param candidates: how many of the best current placements are
+        re-scored with the next piece.
+        :param cache_size: the most searches kept in the transposition table.
+        Searches are reused while the same piece falls, so a few suffice and
+        the collector is not left walking thousands of stale ones.
+        :param budget: the milliseconds a decision may take, None -> search
+        everything, so the bot plays the same on any machine.
+        """
+        self.evaluate: Callable[[Board, int], float] = evaluate
+        self.lookahead: bool = lookahead
+        self.candidates: int = candidates
+        self.budget: float | None = None if budget is None \
+            else budget / 1000
+
+        # searches keyed by board rows, shape and start pose, least recently
+        # used first, with whether they ran to completion
+        self.searches: OrderedDict[tuple,
+                                   tuple[list[Pose], dict, bool]] = \
+            OrderedDict()
+        self.cache_size: int = cache_size
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+
+        self.piece_count: int = -1
+        self.target: Pose | None = None
+        self.plan: deque[tuple[Pose, Action]] = deque()
+
+        self.decision_time: float = 0.0
+        self.over_budget: int = 0
+
+
+    def next_action(self, engine: TetrisEngine) -> Action:
+        """
+        Return the next action to apply to an engine, choosing a new target
+        placement whenever a new piece has spawned.
+
+        :param engine: the engine being played.
+        :return: the action.
+        """
+        if engine.game_over:
+            return Action.NONE
+
+        piece = engine.piece
+        pose: Pose = (piece.x, piece.y, piece.rotation)
+
+        if engine.pieces != self.piece_count:
+            self.piece_count = engine.pieces
+            self.choose(engine)
+
+        if pose == self.target:
+            return Action.DROP
+
+        # gravity moved the piece off the planned path, replanning and any
+        # new decision share one budget
+        if not self.plan or self.plan[0][0] != pose:
+            deadline: float | None = None if self.budget is None \
+                else perf_counter() + self.budget
+            self.plan_path(engine.board, piece.shape, pose, deadline)
+            if not self.plan:
+                self.choose(engine, deadline)
+                if pose == self.target or not self.plan:
+                    return Action.DROP
+
+        return self.plan.popleft()[1]
+
+
+    def choose(self, engine: TetrisEngine,
+               deadline: float | None=None) -> None:
+        """
+        Pick the best placement for the current piece and plan the moves to
+        reach it.
+
+        :param engine: the engine being played.
+        :param deadline: the perf_counter() time the decision must be done
+        by, None -> the bot's budget from now.
+        """
+        start: float = perf_counter()
+        if deadline is None and self.budget is not None:
+            deadline = start + self.budget
+
+        piece = engine.piece
+        board: Board = engine.board
+        pose: Pose = (piece.x, piece.y, piece.rotation)
+        finals, _ = self.search(board, piece.shape, pose, deadline)
+
+        scored: list[tuple[float, Pose, Board, int]] = []
+        for final in finals:
+            after: Board = board.copy()
+            lines: int = self.place(after, piece.shape, final)
+            scored.append((self.evaluate(after, lines), final, after, lines))
+
+        if not scored:
+            self.target = None
+            self.plan.clear()
+            return
+
+        if self.lookahead:
+            # best first, so the candidates cut by the deadline are the
+            # least promising ones
+            scored.sort(key=lambda entry: entry[0], reverse=True)
+            looked: list[tuple[float, Pose, Board, int]] = []
+            for _, final, after, lines in scored[:self.candidates]:
+                if looked and deadline is not None and \
+                        perf_counter() > deadline:
+                    break
+                looked.append((self.best_drop(after,
+                                              engine.next_piece.shape, lines),
+                               final, after, lines))
+            scored = looked
+
+        self.target = max(scored, key=lambda entry: entry[0])[1]
+        self.plan_path(board, piece.shape, pose, deadline)
+
+        self.decision_time = perf_counter() - start
+        if self.budget is not None and self.decision_time > self.budget:
+            self.over_budget += 1
+
+
+    def plan_path(self, board: Board, shape: str, pose: Pose,
+                  deadline: float | None=None) -> None:
+        """
+        Plan the shortest sequence of moves from a pose to the target. The
+        plan stays empty if the target is not found by the deadline.
+
+        :param board: the current board.
+        :param shape: the shape of the piece.
+        :param pose: the current pose of the piece.
+        :param deadline: the perf_counter() time to stop searching at,
+        None -> search everything.
+        """
+        self.plan.clear()
+        _, parents = self.search(board, shape, pose, deadline)
+        if self.target not in parents:
+            return
+
+        current: Pose = self.target
+        while current != pose:
+            previous, action = parents[current]
+            self.plan.appendleft((previous, action))
+            current = previous
+
+
+    def search(self, board: Board, shape: str, start: Pose,
+               deadline: float | None=None) -> tuple[list[Pose], dict]:
+        """
+        Find every final placement reachable from a pose with breadth-first
+        search over (x, y, rotation). Results are memoized, so repeated
+        searches of the same position are free; a search cut short by its
+        deadline is only reused by searches that have a deadline too.
+
+        :param board: the board to search on.
+        :param shape: the shape of the piece.
+        :param start: the pose to search from.
+        :param deadline: the perf_counter() time to stop expanding poses
+        at once a final placement is known, None -> search everything.
+        :return: the final poses in the order they were found, and the
+        parent pose and action of every visited pose.
+        """
+        key: tuple = (tuple(board.rows), shape, start)
+        cached: tuple[list[Pose], dict, bool] | None = self.searches.get(key)
+        if cached is not None and (cached[2] or deadline is not None):
+            self.cache_hits += 1
+            self.searches.move_to_end(key)
+            return cached[0], cached[1]
+        self.cache_misses += 1
+
+        states: tuple[RotationState, ...] = STATES[shape]
+        kicks: tuple[tuple[tuple[int,int], ...], ...] = KICKS[shape]
+        fits = board.fits
+
+        parents: dict[Pose, tuple[Pose, Action] | None] = {start: None}
+        finals: list[Pose] = []
+        queue: deque[Pose] = deque([start])
+
+        while queue:
+            if finals and deadline is not None and perf_counter() > deadline:
+                break
+            pose: Pose = queue.popleft()
+            x, y, rotation = pose
+            state: RotationState = states[rotation]
+
+            moves: list[tuple[Pose, Action]] = []
+            if fits(state, x - 1, y):
+                moves.append(((x - 1, y, rotation), Action.LEFT))
+            if fits(state, x + 1, y):
+                moves.append(((x + 1, y, rotation), Action.RIGHT))
+            if fits(state, x, y + 1):
+                moves.append(((x, y + 1, rotation), Action.DOWN))
+            elif y + min(oy for _,oy in state.offsets) >= 0:
+                finals.append(pose)
+
+            turned: int = (rotation + 1) % 4
+            for kx, ky in kicks[rotation]:
+                if fits(states[turned], x + kx, y + ky):
+                    moves.append(((x + kx, y + ky, turned), Action.ROTATE))
+                    break
+
+            for move, action in moves:
+                if move not in parents:
+                    parents[move] = (pose, action)
+                    queue.append(move)
+
+        if key in self.searches:
+            self.searches.move_to_end(key)
+        elif len(self.searches) >= self.cache_size:
+            self.searches.popitem(last=False)
+        # a queue left over means the deadline cut the search short
+        self.searches[key] = (finals, parents, not queue)
+        return finals, parents
+
+
+    def best_drop(self, board: Board, shape: str, lines: int) -> float:
+        """
+        Score a board by the best straight drop of the next piece.
+
+        :param board: the board after the current piece is placed.
+        :param shape: the shape of the next piece.
+        :param lines: the rows already cleared by the current piece.
+        :return: the best score, or the board's own score if the next piece
+        has nowhere to go.
+        """
+        tops: list[int] = [board.height] * board.width
+        for y in range(board.height - 1, -1, -1):
+            row: int = board.rows[y]
+            while row:
+                lowest: int = row & -row
+                tops[lowest.bit_length() - 1] = y
+                row ^= lowest
+
+        best: float | None = None
+        for rotation, state, bottoms in DROP_STATES[shape]:
+            for x in range(-state.min_x, board.width - state.max_x):
+                y: int = min(tops[x + dx] - dy - 1 for dx,dy in bottoms)
+                if y + min(oy for _,oy in state.offsets) < 0:
+                    continue
+                after: Board = board.copy()
+                cleared: int = self.place(after, shape, (x, y, rotation))
+                score: float = self.evaluate(after, lines + cleared)
+                if best is None or score > best:
+                    best = score
+
+        return self.evaluate(board, lines) if best is None else best
+
+
+    def place(self, board: Board, shape: str, pose: Pose) -> int:
+        """
+        Place a piece on a board and clear any completed rows.
+
+        :param board: the board to modify.
+        :param shape: the shape of the piece.
+        :param pose: where the piece comes to rest.
+        :return: the number of rows cleared.
+        """
+        x, y, rotation = pose
+        cells: list[tuple[int,int]] = [(x + ox, y + oy) for ox,oy
+                                       in STATES[shape][rotation].offsets]
+        board.place(cells, 1)
+        return board.clear_full_lines([cy for _,cy in cells])
@@ -0,0 +1,134 @@
+from typing import NamedTuple
+
+import game_settings as gs
+
+
+class RotationState(NamedTuple):
+    """The precomputed integer layout of one shape in one orientation."""
+    offsets: tuple[tuple[int,int], ...]
+    rows: tuple[tuple[int,int], ...]
+    min_x: int
+    max_x: int
+    max_y: int
+
+
+def build_states(offsets: list[tuple[int,int]],
+                 rotates: bool=True) -> tuple[RotationState, ...]:
+    """
+    Precompute the four orientations of a shape, each rotated by 90 degrees
+    clockwise around the first block.
+
+    :param offsets: the block offsets of the spawn orientation.
+    :param rotates: whether the shape changes when rotated.
+    :return: the orientations in clockwise order starting at spawn.
+    """
+    states: list[RotationState] = []
+    current: tuple[tuple[int,int], ...] = tuple(offsets)
+
+    for _ in range(4):
+        min_x: int = min(x for x,_ in current)
+
+        # one bitmask per occupied row, relative to the leftmost block
+        row_masks: dict[int, int] = {}
+        for x,y in current:
+            row_masks[y] = row_masks.get(y, 0) | 1 << (x - min_x)
+
+        states.append(RotationState(current,
+                                    tuple(sorted(row_masks.items())),
+                                    min_x,
+                                    max(x for x,_ in current),
+                                    max(y for _,y in current)))
+        if rotates:
+            current = tuple((-y, x) for x,y in current)
+
+    return tuple(states)
+
+
+def flip_kicks(table: tuple[tuple[tuple[int,int], ...], ...]) \
+        -> tuple[tuple[tuple[int,int], ...], ...]:
+    """
+    Convert a kick table from the y-up convention of the SRS guideline to
+    the y-down grid used by the board.
+
+    :param table: the kick offsets to try for each starting orientation.
+    :return: the converted table.
+    """
+    return tuple(tuple((x, -y) for x,y in kicks) for kicks in table)
+
+
+# shape ids as stored on the board, 0 is reserved for empty cells
+SHAPES: tuple[str, ...] = tuple(gs.TETROMINOES)
+SHAPE_IDS: dict[str, int] = {shape: idx + 1
+                             for idx, shape in enumerate(SHAPES)}
+
+STATES: dict[str, tuple[RotationState, ...]] = \
+    {shape: build_states(offsets, shape != "O")
+     for shape, offsets in gs.TETROMINOES.items()}
+
+# clockwise SRS kicks, indexed by the orientation rotated from
+JLSTZ_KICKS: tuple[tuple[tuple[int,int], ...], ...] = flip_kicks((
+    ((0,0), (-1,0), (-1,1), (0,-2), (-1,-2)),
+    ((0,0), (1,0), (1,-1), (0,2), (1,2)),
+    ((0,0), (1,0), (1,1), (0,-2), (1,-2)),
+    ((0,0), (-1,0), (-1,-1), (0,2), (-1,2)),
+))
+I_KICKS: tuple[tuple[tuple[int,int], ...], ...] = flip_kicks((
+    ((0,0), (-2,0), (1,0), (-2,-1), (1,2)),
+    ((0,0), (-1,0), (2,0), (-1,2), (2,-1)),
+    ((0,0), (2,0), (-1,0), (2,1), (-1,-2)),
+    ((0,0), (1,0), (-2,0), (1,-2), (-2,1)),
+))
+NO_KICKS: tuple[tuple[tuple[int,int], ...], ...] = (((0,0),),) * 4
+
+KICKS: dict[str, tuple[tuple[tuple[int,int], ...], ...]] = \
+    {shape: NO_KICKS if shape == "O" or not gs.WALL_KICKS
+     else I_KICKS if shape == "I" else JLSTZ_KICKS
+     for shape in SHAPES}
+
+
+class Piece:
+    """Represents a falling tetromino in integer grid coordinates."""
+    def __init__(self, shape: str) -> None:
+        """
+        Initialize a piece at the spawn position.
+
+        :param shape: the key of the shape in gs.TETROMINOES.
+        """
+        self.shape: str = shape
+        self.shape_id: int = SHAPE_IDS[shape]
+        self.states: tuple[RotationState, ...] = STATES[shape]
+        self.kicks: tuple[tuple[tuple[int,int], ...], ...] = KICKS[shape]
+
+        self.x, self.y = gs.initial_offset
+        self.rotation: int = 0
+
+
+    @property
+    def state(self) -> RotationState:
+        """
+        Return the precomputed layout of the current orientation.
+
+        :return: the rotation state.
+        """
+        return self.states[self.rotation]
+
+
+    @property
+    def offsets(self) -> tuple[tuple[int,int], ...]:
+        """
+        Return the block offsets of the current orientation.
+
+        :return: the offsets relative to the first block.
+        """
+        return self.states[self.rotation].offsets
+
+
+    def cells(self) -> list[tuple[int,int]]:
+        """
+        Return the grid cells covered by the piece.
+
+        :return: the x and y grid coordinates of each block.
+        """
+        x: int = self.x
+        y: int = self.y
+        return [(x + ox, y + oy) for ox,oy in self.offsets]
@@ -0,0 +1,45 @@
+import random
+
+from engine.pieces import SHAPES
+
+
+# generator modes
+UNIFORM: str = "uniform"
+BAG: str = "bag"
+MODES: tuple[str, ...] = (UNIFORM, BAG)
+
+
+class PieceGenerator:
+    """
+    Represents a seedable source of shapes. Uniform mode picks every shape
+    independently, bag mode deals all seven shapes in a shuffled order
+    before starting a new bag.
+    """
+    def __init__(self, seed: int | None=None, mode: str=UNIFORM) -> None:
+        """
+        Initialize a piece generator.
+
+        :param seed: the seed, a random one is chosen if omitted.
+        :param mode: either UNIFORM or BAG.
+        """
+        if mode not in MODES:
+            raise ValueError(f"unknown piece generator mode: {mode}")
+
+        self.seed: int = random.getrandbits(64) if seed is None else seed
+        self.mode: str = mode
+        self.rng: random.Random = random.Random(self.seed)
+        self.bag: list[str] = []
+
+
+    def next_shape(self) -> str:
+        """
+        Return the next shape.
+
+        :return: the key of the shape in gs.TETROMINOES.
+        """
+        if self.mode == BAG:
+            if not self.bag:
+                self.bag = list(SHAPES)
+                self.rng.shuffle(self.bag)
+            return self.bag.pop()
+        return self.rng.choice(SHAPES)
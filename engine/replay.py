@@ -0,0 +1,176 @@
+import struct
+import sys
+from time import perf_counter
+
+import game_settings as gs
+from engine.randomizer import MODES, PieceGenerator
+from engine.rules import Action, TetrisEngine
+
+
+# magic, version, generator mode, tick rate, seed, length in ticks
+HEADER: struct.Struct = struct.Struct("<4sBBHQI")
+MAGIC: bytes = b"TRPL"
+VERSION: int = 1
+
+
+class Replay:
+    """
+    Represents a recorded game: the piece generator seed and mode plus
+    every non-idle input, timestamped by the logic tick it was applied on.
+
+    The binary form is a fixed header followed by one record per input,
+    each a varint tick delta since the previous input and one action byte.
+    """
+    def __init__(self, seed: int, mode: str, tick_rate: int=gs.tick_rate,
+                 length: int=0,
+                 inputs: list[tuple[int,Action]] | None=None) -> None:
+        """
+        Initialize a replay.
+
+        :param seed: the seed of the piece generator.
+        :param mode: the mode of the piece generator.
+        :param tick_rate: the logic ticks per second of the recording.
+        :param length: the number of ticks recorded.
+        :param inputs: pairs of tick and action, in tick order.
+        """
+        self.seed: int = seed
+        self.mode: str = mode
+        self.tick_rate: int = tick_rate
+        self.length: int = length
+        self.inputs: list[tuple[int,Action]] = inputs or []
+
+
+    def record(self, tick: int, action: Action) -> None:
+        """
+        Record the action applied on a given tick. Idle ticks are implied.
+
+        :param tick: the engine tick the action was applied on.
+        :param action: the action.
+        """
+        if action != Action.NONE:
+            self.inputs.append((tick, action))
+        self.length = tick + 1
+
+
+    def truncate(self, tick: int) -> None:
+        """
+        Forget every input from a given tick on, e.g. after rewinding.
+
+        :param tick: the first tick to forget.
+        """
+        while self.inputs and self.inputs[-1][0] >= tick:
+            self.inputs.pop()
+        self.length = min(self.length, tick)
+
+
+    def to_bytes(self) -> bytes:
+        """
+        Encode the replay in its compact binary form.
+
+        :return: the encoded replay.
+        """
+        data: bytearray = bytearray(HEADER.pack(MAGIC, VERSION,
+                                                MODES.index(self.mode),
+                                                self.tick_rate, self.seed,
+                                                self.length))
+        previous: int = 0
+        for tick, action in self.inputs:
+            delta: int = tick - previous
+            previous = tick
+            while delta >= 0x80:
+                data.append(delta & 0x7f | 0x80)
+                delta >>= 7
+            data.append(delta)
+            data.append(action)
+        return bytes(data)
+
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        """
+        Decode a replay from its binary form.
+
+        :param data: the encoded replay.
+        :return: the decoded replay.
+        """
+        magic, version, mode, tick_rate, seed, length = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a supported replay file")
+
+        inputs: list[tuple[int,Action]] = []
+        tick: int = 0
+        pos: int = HEADER.size
+        while pos < len(data):
+            delta: int = 0
+            shift: int = 0
+            while data[pos] & 0x80:
+                delta |= (data[pos] & 0x7f) << shift
+                shift += 7
+                pos += 1
+            delta |= data[pos] << shift
+            tick += delta
+            inputs.append((tick, Action(data[pos + 1])))
+            pos += 2
+
+        return cls(seed, MODES[mode], tick_rate, length, inputs)
+
+
+    def save(self, path: str) -> None:
+        """
+        Write the replay to a file.
+
+        :param path: the file path.
+        """
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+
+    @classmethod
+    def load(cls, path: str) -> "Replay":
+        """
+        Read a replay from a file.
+
+        :param path: the file path.
+        :return: the decoded replay.
+        """
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+def play(replay: Replay) -> TetrisEngine:
+    """
+    Re-execute a recorded game headlessly as fast as possible.
+
+    :param replay: the replay to run.
+    :return: the engine in the state the recording ended in.
+    """
+    engine: TetrisEngine = TetrisEngine(PieceGenerator(replay.seed,
+                                                       replay.mode))
+    tick: int = 0
+    for input_tick, action in replay.inputs:
+        while tick < input_tick and not engine.game_over:
+            engine.tick()
+            tick += 1
+        if engine.game_over:
+            return engine
+        engine.tick(action)
+        tick += 1
+
+    while tick < replay.length and not engine.game_over:
+        engine.tick()
+        tick += 1
+    return engine
+
+
+if __name__ == "__main__":
+    recording: Replay = Replay.load(sys.argv[1] if len(sys.argv) > 1
+                                    else gs.REPLAY_PATH)
+    start: float = perf_counter()
+    result: TetrisEngine = play(recording)
+    elapsed: float = perf_counter() - start
+
+    print(f"ticks: {result.ticks} ({result.ticks / recording.tick_rate:.1f}s "
+          f"of play in {elapsed:.3f}s)")
+    print(f"score: {result.score} lines: {result.lines} "
+          f"pieces: {result.pieces} game over: {result.game_over}")
@@ -0,0 +1,250 @@
+from collections import deque
+from enum import IntEnum
+from typing import NamedTuple
+
+import game_settings as gs
+from engine.board import Board
+from engine.pieces import Piece, RotationState
+from engine.randomizer import PieceGenerator
+
+
+class Action(IntEnum):
+    """The inputs understood by the rules engine."""
+    NONE = 0
+    LEFT = 1
+    RIGHT = 2
+    ROTATE = 3
+    DOWN = 4
+    DROP = 5
+    SOFT_DROP = 6
+
+
+class StepResult(NamedTuple):
+    """The outcome of a single engine step."""
+    moved: bool
+    locked: bool
+    lines_cleared: int
+    game_over: bool
+
+
+class TetrisEngine:
+    """
+    Represents the rules of a single game with no display, timer or asset
+    dependency. Gravity is just another action: step() applies actions
+    immediately, while tick() advances a fixed-length logic tick and applies
+    gravity every gs.GRAVITY_TICKS ticks.
+    """
+    def __init__(self, generator: PieceGenerator | None=None,
+                 width: int=gs.grid_width,
+                 height: int=gs.grid_height) -> None:
+        """
+        Initialize a new game.
+
+        :param generator: the source of shapes, seeded randomly in
+        gs.PIECE_GENERATOR mode if omitted.
+        :param width: the number of columns on the board.
+        :param height: the number of rows on the board.
+        """
+        self.generator: PieceGenerator = generator or \
+            PieceGenerator(mode=gs.PIECE_GENERATOR)
+        self.board: Board = Board(width, height)
+
+        self.score: int = 0
+        self.lines: int = 0
+        self.pieces: int = 0
+        self.game_over: bool = False
+
+        # gravity, counted in logic ticks
+        self.ticks: int = 0
+        self.fall_timer: int = 0
+        self.soft_drop: bool = False
+
+        # the cells filled by the most recent lock, for renderers
+        self.locked_cells: list[tuple[int,int]] = []
+
+        # versus: lines and hole column of the garbage waiting to rise, and
+        # what the most recent lock sent and raised
+        self.garbage: deque[tuple[int,int]] = deque()
+        self.garbage_sent: int = 0
+        self.garbage_raised: int = 0
+
+        self.piece: Piece = self.new_piece()
+        self.next_piece: Piece = self.new_piece()
+
+
+    def new_piece(self) -> Piece:
+        """
+        Create a piece with the next shape from the generator.
+
+        :return: the new piece.
+        """
+        return Piece(self.generator.next_shape())
+
+
+    def step(self, action: Action) -> StepResult:
+        """
+        Apply one action to the current piece.
+
+        :param action: the action to apply. DOWN locks the piece when it
+        cannot move any further, DROP moves it down until it locks and
+        SOFT_DROP speeds up gravity until the piece locks.
+        :return: what happened as a result of the action.
+        """
+        if self.game_over:
+            return StepResult(False, False, 0, True)
+
+        moved: bool = False
+        locked: bool = False
+        lines: int = 0
+
+        if action == Action.LEFT:
+            moved = self.shift(-1, 0)
+        elif action == Action.RIGHT:
+            moved = self.shift(1, 0)
+        elif action == Action.ROTATE:
+            moved = self.rotate()
+        elif action == Action.DOWN:
+            moved = self.shift(0, 1)
+            if not moved:
+                lines = self.lock()
+                locked = True
+        elif action == Action.DROP:
+            while self.shift(0, 1):
+                moved = True
+            lines = self.lock()
+            locked = True
+        elif action == Action.SOFT_DROP:
+            self.soft_drop = True
+
+        return StepResult(moved, locked, lines, self.game_over)
+
+
+    def tick(self, action: Action=Action.NONE) -> StepResult:
+        """
+        Advance the game by one logic tick: apply an action, then move the
+        piece down if its gravity interval has elapsed.
+
+        :param action: the action to apply during this tick.
+        :return: what happened during the tick.
+        """
+        self.ticks += 1
+        result: StepResult = self.step(action)
+        if result.locked or self.game_over:
+            return result
+
+        self.fall_timer += 1
+        interval: int = gs.FAST_GRAVITY_TICKS if self.soft_drop \
+            else gs.GRAVITY_TICKS
+        if self.fall_timer < interval:
+            return result
+
+        self.fall_timer = 0
+        gravity: StepResult = self.step(Action.DOWN)
+        return StepResult(result.moved or gravity.moved, gravity.locked,
+                          gravity.lines_cleared, gravity.game_over)
+
+
+    def shift(self, dx: int, dy: int) -> bool:
+        """
+        Move the current piece if the target cells are free.
+
+        :param dx: the horizontal distance.
+        :param dy: the vertical distance.
+        :return: whether the piece moved.
+        """
+        piece: Piece = self.piece
+        if not self.board.fits(piece.states[piece.rotation],
+                               piece.x + dx, piece.y + dy):
+            return False
+        piece.x += dx
+        piece.y += dy
+        return True
+
+
+    def rotate(self) -> bool:
+        """
+        Rotate the current piece by 90 degrees clockwise, trying each wall
+        kick offset in turn when the plain rotation is blocked.
+
+        :return: whether the piece rotated.
+        """
+        piece: Piece = self.piece
+        rotation: int = (piece.rotation + 1) % 4
+        state: RotationState = piece.states[rotation]
+
+        for kx, ky in piece.kicks[piece.rotation]:
+            if self.board.fits(state, piece.x + kx, piece.y + ky):
+                piece.x += kx
+                piece.y += ky
+                piece.rotation = rotation
+                return True
+        return False
+
+
+    def receive_garbage(self, lines: int, hole: int) -> None:
+        """
+        Queue garbage sent by an opponent. It rises with the next lock that
+        clears no lines, clears cancel it first.
+
+        :param lines: the number of garbage rows.
+        :param hole: the empty column of the garbage rows.
+        """
+        self.garbage.append((lines, hole))
+
+
+    def lock(self) -> int:
+        """
+        Store the current piece on the board, clear completed rows and
+        spawn the next piece. The game is over when a piece locks with any
+        block above the top of the grid, or garbage pushes blocks off it.
+
+        :return: the number of rows cleared.
+        """
+        cells: list[tuple[int,int]] = self.piece.cells()
+        self.fall_timer = 0
+        self.soft_drop = False
+        if any(y < 0 for _,y in cells):
+            self.game_over = True
+            return 0
+
+        self.board.place(cells, self.piece.shape_id)
+        self.locked_cells = cells
+        self.score += gs.PIECE_SCORE
+        self.pieces += 1
+
+        cleared: int = self.board.clear_full_lines([y for _,y in cells])
+        self.score += cleared * gs.LINE_SCORE
+        self.lines += cleared
+        self.exchange_garbage(cleared)
+
+        self.piece = self.next_piece
+        self.next_piece = self.new_piece()
+        return cleared
+
+
+    def exchange_garbage(self, cleared: int) -> None:
+        """
+        Work out the garbage of a lock: cleared lines cancel waiting garbage
+        and whatever is left over is sent, while a lock that clears nothing
+        lets the waiting garbage rise.
+
+        :param cleared: the number of rows the lock cleared.
+        """
+        attack: int = gs.GARBAGE_LINES[cleared]
+        while attack and self.garbage:
+            lines, hole = self.garbage.popleft()
+            if lines > attack:
+                self.garbage.appendleft((lines - attack, hole))
+                attack = 0
+            else:
+                attack -= lines
+        self.garbage_sent = attack
+
+        self.garbage_raised = 0
+        if cleared:
+            return
+        while self.garbage:
+            lines, hole = self.garbage.popleft()
+            self.garbage_raised += lines
+            if self.board.add_garbage(lines, hole):
+                self.game_over = True
@@ -0,0 +1,261 @@
+import struct
+from array import array
+from collections import deque
+
+import game_settings as gs
+from engine.board import GARBAGE_ID, Board
+from engine.pieces import SHAPES, STATES, Piece
+from engine.randomizer import MODES
+from engine.rules import Action, TetrisEngine
+
+
+# version, generator seed and mode, ticks, score, lines, pieces, game over,
+# soft drop, fall timer, piece shape id, x, y and rotation, next shape id,
+# board width and height, garbage and bag lengths, gaussian flag and value
+STATE: struct.Struct = struct.Struct("<BQBIIII??HBbbBBBBBB?d")
+VERSION: int = 2
+
+# words in the state of the Mersenne Twister behind random.Random
+RNG_WORDS: int = 625
+
+
+def word_size(width: int) -> int:
+    """
+    Return the bytes used for each board row and garbage entry, wide enough
+    for a row bitmask of any board width.
+
+    :param width: the number of columns.
+    :return: the size of one word in bytes.
+    """
+    return max(2, (width + 7) // 8)
+
+
+def state_size(width: int, height: int, garbage: int, bag: int) -> int:
+    """
+    Return the length of a state encoded by pack_state().
+
+    :param width: the number of columns.
+    :param height: the number of rows.
+    :param garbage: the number of waiting garbage entries.
+    :param bag: the number of shapes left in the generator's bag.
+    :return: the size in bytes.
+    """
+    word: int = word_size(width)
+    return STATE.size + (word + width) * height + 2 * word * garbage + \
+        bag + 4 * RNG_WORDS
+
+
+def pack_state(engine: TetrisEngine) -> bytes:
+    """
+    Encode everything needed to continue a game exactly: the board, both
+    pieces, the counters, waiting garbage and the piece generator's bag and
+    random state. Renderer-only data such as locked_cells is left out.
+
+    :param engine: the game.
+    :return: the encoded state, about 2.8 KB for the default board.
+    """
+    board: Board = engine.board
+    piece: Piece = engine.piece
+    _, words, gauss = engine.generator.rng.getstate()
+
+    data: bytearray = bytearray(STATE.pack(
+        VERSION, engine.generator.seed, MODES.index(engine.generator.mode),
+        engine.ticks, engine.score, engine.lines, engine.pieces,
+        engine.game_over, engine.soft_drop, engine.fall_timer,
+        piece.shape_id, piece.x, piece.y, piece.rotation,
+        engine.next_piece.shape_id, board.width, board.height,
+        len(engine.garbage), len(engine.generator.bag),
+        gauss is not None, gauss or 0.0))
+
+    word: int = word_size(board.width)
+    for row in board.rows:
+        data += row.to_bytes(word, "little")
+    for colors in board.colors:
+        data += colors
+    for lines, hole in engine.garbage:
+        data += lines.to_bytes(word, "little")
+        data += hole.to_bytes(word, "little")
+    data += bytes(SHAPES.index(shape) for shape in engine.generator.bag)
+    data += array('I', words).tobytes()
+    return bytes(data)
+
+
+def unpack_state(engine: TetrisEngine, data: bytes) -> None:
+    """
+    Restore a state encoded by pack_state() into an engine, replacing its
+    board, pieces and generator state. The state is checked before the
+    engine is touched, so a rejected state leaves the game as it was.
+
+    :param engine: the engine to restore into.
+    :param data: the encoded state.
+    :raises ValueError: the state is damaged, from another version or for
+    a board of another size than the engine's.
+    """
+    if len(data) < STATE.size:
+        raise ValueError("not a supported save state")
+    (version, seed, mode, ticks, score, lines, pieces, game_over, soft_drop,
+     fall_timer, shape_id, x, y, rotation, next_id, width, height,
+     garbage, bag, has_gauss, gauss) = STATE.unpack_from(data)
+    if version != VERSION:
+        raise ValueError("not a supported save state")
+    if (width, height) != (engine.board.width, engine.board.height):
+        raise ValueError("save state is for another board size")
+    if len(data) != state_size(width, height, garbage, bag) or \
+            mode >= len(MODES) or \
+            not 0 < shape_id <= len(SHAPES) or \
+            not 0 < next_id <= len(SHAPES) or \
+            rotation >= len(STATES[SHAPES[shape_id - 1]]):
+        raise ValueError("damaged save state")
+
+    pos: int = STATE.size
+    word: int = word_size(width)
+    board: Board = Board(width, height)
+    board.rows = [int.from_bytes(data[pos + y * word:pos + (y + 1) * word],
+                                 "little") for y in range(height)]
+    pos += word * height
+    board.colors = [bytearray(data[pos + y * width:pos + (y + 1) * width])
+                    for y in range(height)]
+    pos += width * height
+
+    if any(row & ~board.full_row for row in board.rows) or \
+            any(max(colors) > GARBAGE_ID for colors in board.colors):
+        raise ValueError("damaged save state")
+
+    piece: Piece = Piece(SHAPES[shape_id - 1])
+    piece.x, piece.y = x, y
+    piece.rotation = rotation
+    if not game_over and not board.fits(piece.state, x, y):
+        raise ValueError("damaged save state")
+
+    entries: list[int] = [int.from_bytes(data[pos + i * word:
+                                              pos + (i + 1) * word], "little")
+                          for i in range(2 * garbage)]
+    pos += 2 * word * garbage
+    shapes: bytes = data[pos:pos + bag]
+    pos += bag
+    words: tuple[int, ...] = tuple(array('I',
+                                         data[pos:pos + 4 * RNG_WORDS]))
+    if any(hole >= width for hole in entries[1::2]) or \
+            any(index >= len(SHAPES) for index in shapes) or \
+            words[-1] > RNG_WORDS - 1:
+        raise ValueError("damaged save state")
+
+    generator = engine.generator
+    generator.rng.setstate((3, words, gauss if has_gauss else None))
+    generator.seed = seed
+    generator.mode = MODES[mode]
+    generator.bag = [SHAPES[index] for index in shapes]
+
+    engine.garbage = deque(zip(entries[::2], entries[1::2]))
+    engine.board = board
+    engine.ticks = ticks
+    engine.score = score
+    engine.lines = lines
+    engine.pieces = pieces
+    engine.game_over = game_over
+    engine.soft_drop = soft_drop
+    engine.fall_timer = fall_timer
+    engine.locked_cells = []
+
+    engine.piece = piece
+    engine.next_piece = Piece(SHAPES[next_id - 1])
+
+
+class Rewind:
+    """
+    Represents the recent history of a game for rewinding. Rather than a
+    copy of the game per tick, it keeps a packed state every
+    gs.REWIND_KEYFRAME ticks and one action byte per tick in a ring buffer.
+    The engine is deterministic, so any tick in the window is rebuilt by
+    restoring the keyframe before it and replaying the actions in between.
+    Memory is bounded by the window length whatever the game length.
+    """
+    def __init__(self, seconds: int=gs.REWIND_SECONDS,
+                 interval: int=gs.REWIND_KEYFRAME) -> None:
+        """
+        Initialize an empty history.
+
+        :param seconds: the length of the window that can be rewound.
+        :param interval: the ticks between keyframes.
+        """
+        self.capacity: int = seconds * gs.tick_rate
+        self.interval: int = interval
+
+        # the action applied on tick t is at t % capacity
+        self.actions: bytearray = bytearray(self.capacity)
+        self.end: int = 0
+
+        # pairs of tick and the state before that tick, oldest first
+        self.keyframes: deque[tuple[int, bytes]] = deque()
+
+
+    def record(self, engine: TetrisEngine, action: Action) -> None:
+        """
+        Record the action about to be applied on the engine's next tick.
+
+        :param engine: the game, before the tick.
+        :param action: the action.
+        """
+        tick: int = engine.ticks
+        if not self.keyframes or tick % self.interval == 0 and \
+                self.keyframes[-1][0] != tick:
+            self.keyframes.append((tick, pack_state(engine)))
+
+        self.actions[tick % self.capacity] = action
+        self.end = tick + 1
+        self.evict()
+
+
+    def evict(self) -> None:
+        """
+        Drop the keyframes whose following actions have been overwritten in
+        the ring, keeping the newest one.
+        """
+        oldest: int = self.end - self.capacity
+        while len(self.keyframes) > 1 and self.keyframes[0][0] < oldest:
+            self.keyframes.popleft()
+
+
+    def rewind(self, engine: TetrisEngine, ticks: int) -> bool:
+        """
+        Take the game back by a number of ticks, as far as the history
+        goes, and forget the ticks after it.
+
+        :param engine: the game to rewind.
+        :param ticks: how far to go back.
+        :return: True -> the game went back, False -> no history is left.
+        """
+        self.evict()
+        if not self.keyframes:
+            return False
+        target: int = max(self.keyframes[0][0], engine.ticks - ticks)
+        if target >= engine.ticks:
+            return False
+
+        while self.keyframes[-1][0] > target:
+            self.keyframes.pop()
+        start, state = self.keyframes[-1]
+        unpack_state(engine, state)
+        for tick in range(start, target):
+            engine.tick(Action(self.actions[tick % self.capacity]))
+
+        self.end = target
+        return True
+
+
+    def clear(self) -> None:
+        """
+        Forget the history, e.g. after loading a saved state.
+        """
+        self.keyframes.clear()
+        self.end = 0
+
+
+    def memory_usage(self) -> int:
+        """
+        Return the bytes held by the history.
+
+        :return: the size of the action ring and the keyframes.
+        """
+        return len(self.actions) + sum(len(state)
+                                       for _, state in self.keyframes)
@@ -0,0 +1,246 @@
+import struct
+
+import game_settings as gs
+from engine.pieces import SHAPES, STATES
+from engine.rules import TetrisEngine
+
+
+# flags, match id of the sender and of the peer it last heard from,
+# sequence number, ack of the peer's packets, base of the delta
+HEADER: struct.Struct = struct.Struct("<BIIIII")
+# shape id, rotation, x, y, score, changed rows, attacks
+POSE: struct.Struct = struct.Struct("<BBbbIBB")
+# row index, row bitmask
+ROW: struct.Struct = struct.Struct("<BH")
+# attack id, lines, hole column
+ATTACK: struct.Struct = struct.Struct("<HBB")
+
+# header flags
+RESYNC: int = 1 # the sender could not apply a delta, send one from empty
+GAME_OVER: int = 2
+
+
+class BoardSync:
+    """
+    Represents both ends of the board sync between two versus games. Every
+    tick, encode() describes the local game as a delta against the last of
+    its boards the peer acknowledged: only the rows that changed since,
+    plus the falling piece and score. decode() applies the peer's packets
+    to a view of the remote game. Packets may be lost, duplicated or
+    reordered:
+
+    - sequence numbers drop stale packets, and each packet acknowledges
+      the newest one applied from the other side;
+    - a delta whose base the receiver no longer has is dropped and the
+      receiver asks for a resync, which the sender answers with a delta
+      from the empty board, so only non-empty rows are sent even then;
+    - garbage is resent in every packet until a packet carrying it is
+      acknowledged, and applied once by attack id;
+    - every packet names the sender's match and the match of the peer it
+      answers, so packets left over from an earlier match are dropped and
+      acks meant for an earlier match are ignored.
+
+    Rows are sent as 16-bit masks, so boards may be at most 16 wide.
+    """
+    def __init__(self, match: int, ended: set[int] | None=None,
+                 height: int=gs.grid_height,
+                 history: int=gs.SYNC_HISTORY) -> None:
+        """
+        Initialize the sync of a new game on both sides.
+
+        :param match: the nonzero id of the local game, random per match.
+        :param ended: the ids of the peer's games in earlier matches.
+        :param height: the number of rows on the boards.
+        :param history: the most boards kept on each side as delta bases.
+        """
+        self.history: int = history
+        self.height: int = height
+        empty: tuple[int, ...] = (0,) * height
+
+        self.match: int = match
+        self.ended: set[int] = set() if ended is None else ended
+
+        # local side, sequence 0 is the empty board both sides start from
+        self.seq: int = 0
+        self.acked: int = 0
+        self.sent: dict[int, tuple[int, ...]] = {0: empty}
+        self.resync_requested: bool = False
+
+        # garbage not acknowledged yet, as id, lines, hole, first sequence
+        self.attacks: list[tuple[int,int,int,int]] = []
+        self.attack_id: int = 0
+
+        # counters
+        self.bytes_sent: int = 0
+        self.dropped: int = 0
+
+        # remote side, 0 -> not heard from the peer yet
+        self.remote_match: int = 0
+        self.reset_remote()
+
+
+    def reset_remote(self) -> None:
+        """
+        Forget the remote game, when the sync starts or the peer starts a
+        new match.
+        """
+        empty: tuple[int, ...] = (0,) * self.height
+        self.remote_seq: int = 0
+        self.remote_attack: int = 0
+        self.received: dict[int, tuple[int, ...]] = {0: empty}
+        self.need_resync: bool = False
+
+        # the latest view of the remote game
+        self.rows: tuple[int, ...] = empty
+        self.pose: tuple[int,int,int,int] = (0, 0, 0, 0)
+        self.score: int = 0
+        self.remote_over: bool = False
+
+
+    def attack(self, lines: int, hole: int) -> None:
+        """
+        Send garbage to the peer with the following packets.
+
+        :param lines: the number of garbage rows.
+        :param hole: the empty column of the garbage rows.
+        """
+        self.attack_id += 1
+        self.attacks.append((self.attack_id, lines, hole, self.seq + 1))
+
+
+    def encode(self, engine: TetrisEngine) -> bytes:
+        """
+        Describe the local game in the next packet.
+
+        :param engine: the local game.
+        :return: the packet.
+        """
+        self.seq += 1
+        rows: tuple[int, ...] = tuple(engine.board.rows)
+
+        base: int = self.acked
+        if self.resync_requested or base not in self.sent:
+            base = 0
+            self.resync_requested = False
+        base_rows: tuple[int, ...] = self.sent[base]
+        changed: list[tuple[int,int]] = [(y, row) for y, (row, old)
+                                         in enumerate(zip(rows, base_rows))
+                                         if row != old]
+
+        self.sent[self.seq] = rows
+        if len(self.sent) > self.history:
+            # the oldest base after the empty board
+            del self.sent[next(seq for seq in self.sent if seq)]
+
+        flags: int = (RESYNC if self.need_resync else 0) | \
+            (GAME_OVER if engine.game_over else 0)
+        piece = engine.piece
+        data: bytearray = bytearray(HEADER.pack(flags, self.match,
+                                                self.remote_match, self.seq,
+                                                self.remote_seq, base))
+        data += POSE.pack(piece.shape_id, piece.rotation, piece.x, piece.y,
+                          engine.score, len(changed), len(self.attacks))
+        for y, row in changed:
+            data += ROW.pack(y, row)
+        for attack_id, lines, hole, _ in self.attacks:
+            data += ATTACK.pack(attack_id, lines, hole)
+
+        self.bytes_sent += len(data)
+        return bytes(data)
+
+
+    def delivered(self) -> None:
+        """
+        Treat every packet encoded so far as acknowledged, for transports
+        that deliver in order without loss, where the peer sends no acks.
+        """
+        self.acked = self.seq
+        for old in [old for old in self.sent if 0 < old < self.seq]:
+            del self.sent[old]
+        self.attacks.clear()
+
+
+    def decode(self, data: bytes) -> list[tuple[int,int]]:
+        """
+        Apply a packet from the peer to the view of the remote game.
+
+        :param data: the packet.
+        :return: the lines and hole column of garbage not received before.
+        """
+        flags, match, peer_match, seq, ack, base = HEADER.unpack_from(data)
+        if match in self.ended:
+            return []
+        if match != self.remote_match:
+            # the peer started another match since
+            if self.remote_match:
+                self.ended.add(self.remote_match)
+            self.remote_match = match
+            self.reset_remote()
+
+        shape_id, rotation, x, y, score, row_count, attack_count = \
+            POSE.unpack_from(data, HEADER.size)
+        pos: int = HEADER.size + POSE.size
+
+        if flags & RESYNC:
+            self.resync_requested = True
+        if peer_match == self.match and ack > self.acked:
+            self.acked = ack
+            # older boards will never be used as a base again
+            for old in [old for old in self.sent if 0 < old < ack]:
+                del self.sent[old]
+            self.attacks = [attack for attack in self.attacks
+                            if attack[3] > ack]
+
+        changed: list[tuple[int,int]] = [ROW.unpack_from(data, pos + i *
+                                                         ROW.size)
+                                         for i in range(row_count)]
+        pos += row_count * ROW.size
+
+        garbage: list[tuple[int,int]] = []
+        for i in range(attack_count):
+            attack_id, lines, hole = ATTACK.unpack_from(data, pos + i *
+                                                        ATTACK.size)
+            if attack_id > self.remote_attack:
+                self.remote_attack = attack_id
+                garbage.append((lines, hole))
+
+        # stale or duplicated
+        if seq <= self.remote_seq:
+            return garbage
+
+        base_rows: tuple[int, ...] | None = self.received.get(base)
+        if base_rows is None:
+            self.need_resync = True
+            self.dropped += 1
+            return garbage
+
+        rows: list[int] = list(base_rows)
+        for row_y, row in changed:
+            rows[row_y] = row
+        self.rows = tuple(rows)
+        self.received[seq] = self.rows
+        # the peer only bases later deltas on this one or newer
+        for old in [old for old in self.received if 0 < old < base]:
+            del self.received[old]
+        if len(self.received) > self.history:
+            del self.received[next(old for old in self.received if old)]
+
+        self.remote_seq = seq
+        self.need_resync = False
+        self.pose = (shape_id, rotation, x, y)
+        self.score = score
+        self.remote_over = bool(flags & GAME_OVER)
+        return garbage
+
+
+    def piece_cells(self) -> list[tuple[int,int]]:
+        """
+        Return the grid cells covered by the remote falling piece.
+
+        :return: the x and y grid coordinates of each block.
+        """
+        shape_id, rotation, x, y = self.pose
+        if not shape_id:
+            return []
+        offsets = STATES[SHAPES[shape_id - 1]][rotation].offsets
+        return [(x + ox, y + oy) for ox,oy in offsets]
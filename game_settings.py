@@ -1,12 +1,19 @@
-from pygame import Vector2
-
 # screen dimensions
 screen_width: int = 400
 screen_height: int = 500
 
+# "texture" scales the screen to a resizable window through an SDL
+# renderer, "surface" blits to a fixed window; texture falls back to surface
+DISPLAY_BACKEND: str = "texture"
+WINDOW_SIZE: tuple[int,int] = (screen_width, screen_height)
+
 # framerate
 framerate: int = 60
 
+# fixed timestep simulation, independent of the framerate
+tick_rate: int = 100 # logic ticks per second
+max_ticks_per_frame: int = 10
+
 # color definitions
 WHITE: tuple[int,int,int] = (255,255,255)
 BLACK: tuple[int,int,int] = (0,0,0)
@@ -25,12 +32,11 @@ grid_start_x: int = 25
 grid_start_y: int = 50
 
 # tetronimo data
-initial_offset: Vector2 = Vector2(grid_width//2, 0)
-next_block_display_offset: Vector2 = Vector2(200, 200)
+initial_offset: tuple[int,int] = (grid_width//2, 0)
 
-MOVE_DIRECTIONS: dict[str, Vector2] = {'left': Vector2(-1,0),
-                                       'right': Vector2(1,0),
-                                       'down': Vector2(0,1)}
+MOVE_DIRECTIONS: dict[str, tuple[int,int]] = {'left': (-1,0),
+                                              'right': (1,0),
+                                              'down': (0,1)}
 
 TETROMINOES: dict[str, list[tuple[int,int]]] = {'T': [(0,0),(-1,0),(1,0),(0,-1)],
                                                 'O': [(0,0),(0,-1),(1,0),(1,-1)],
@@ -40,6 +46,108 @@ TETROMINOES: dict[str, list[tuple[int,int]]] = {'T': [(0,0),(-1,0),(1,0),(0,-1)]
                                                 'S': [(0,0),(-1,0),(0,-1),(1,-1)],
                                                 'Z': [(0,0),(1,0),(0,-1),(-1,-1)],}
 
+# "uniform" picks every shape independently, "bag" deals all seven in turn
+PIECE_GENERATOR: str = "uniform"
+
+# try SRS-style offsets when a rotation is blocked
+WALL_KICKS: bool = True
+
+# images loaded during startup, as (path, keeps per-pixel alpha)
+ASSET_MANIFEST: list[tuple[str,bool]] = [("assets/ui/main_menu_bg.png", False),
+                                         ("assets/ui/logo.png", True),
+                                         ("assets/ui/play.png", True),
+                                         ("assets/ui/play_H.png", True),
+                                         ("assets/ui/exit.png", True),
+                                         ("assets/ui/exit_H.png", True),
+                                         ("assets/game/block.png", True)] + \
+                                        [(f"assets/game/{shape}.png", True)
+                                         for shape in TETROMINOES]
+
+# the most rendered text surfaces kept in memory
+TEXT_CACHE_SIZE: int = 256
+
+# font used by every screen
+FONT_PATH: str = "assets/fonts/gameboy.ttf"
+
+# the replay of the most recent game
+SAVE_REPLAYS: bool = True
+REPLAY_PATH: str = "replays/last_game.replay"
+
+# rewind, held backspace scrubs back; F5 saves and F9 loads the game
+REWIND_SECONDS: int = 10
+REWIND_KEYFRAME: int = 50 # ticks between full states
+REWIND_SPEED: int = 2 # ticks taken back per tick held
+SAVE_STATE_PATH: str = "saves/quicksave.state"
+
+# particle effects for line clears, locks and game over
+PARTICLE_CAPACITY: int = 512 # live particles, more are dropped
+PARTICLE_BUDGET: int = 128 # particles drawn a frame, more are sampled
+PARTICLE_FADE_LEVELS: int = 4
+PARTICLE_LIFE: int = 40 # ticks
+PARTICLE_SPEED: float = 3.0 # pixels per tick
+PARTICLE_GRAVITY: float = 0.15 # pixels per tick per tick
+LINE_CLEAR_PARTICLES: int = 3 # per cleared block
+GAME_OVER_PARTICLES: int = 2 # per landed block
+SHARD_SIZE: int = 8
+DUST_SIZE: int = 3
+
+# high scores, written in the background
+LEADERBOARD_PATH: str = "scores/leaderboard.db"
+LEADERBOARD_SIZE: int = 3 # top scores shown in the menu
+LEADERBOARD_BATCH: int = 256 # most games written per transaction
+PLAYER_NAME: str = "PLAYER"
+
+# frame profiler, F3 toggles the overlay and F4 writes the csv
+PROFILER_FRAMES: int = 600
+PROFILER_STATS_INTERVAL: int = 15 # frames between percentile updates
+PROFILER_WIDTH: int = 160
+PROFILER_HEIGHT: int = 100
+PROFILER_CSV_PATH: str = "profiles/frames.csv"
+CPU_CSV_PATH: str = "profiles/cpu.csv"
+
+# static screens sleep until input, waking at least this often (ms)
+IDLE_TIMEOUT: int = 250
+
+# bot, the time one decision may take inside a logic tick
+BOT_BUDGET: int = 4 # milliseconds
+
+# scoring
+PIECE_SCORE: int = 10
+LINE_SCORE: int = 100
+
+# versus: garbage lines sent for clearing 0-4 lines at once
+GARBAGE_LINES: tuple[int, ...] = (0, 0, 1, 2, 4)
+
 ## handle block movement 
 TIME_INTERVAL: int = 200 # milliseconds
-FAST_TIME_INTERVAL: int = 10
\ No newline at end of file
+FAST_TIME_INTERVAL: int = 10
+
+GRAVITY_TICKS: int = TIME_INTERVAL * tick_rate // 1000
+FAST_GRAVITY_TICKS: int = max(1, FAST_TIME_INTERVAL * tick_rate // 1000)
+
+## held keys: one move on press, then after the delay one every interval
+DAS_DELAY: int = 170 # milliseconds
+ARR_INTERVAL: int = 50
+SOFT_DROP_INTERVAL: int = FAST_TIME_INTERVAL
+
+DAS_TICKS: int = max(1, DAS_DELAY * tick_rate // 1000)
+ARR_TICKS: int = max(1, ARR_INTERVAL * tick_rate // 1000)
+SOFT_DROP_TICKS: int = max(1, SOFT_DROP_INTERVAL * tick_rate // 1000)
+
+# the most input-to-move latencies kept
+LATENCY_SAMPLES: int = 256
+
+# versus over udp, each process binds the first free port and sends to
+# the other one, so two local processes pair up without configuration
+VERSUS_HOST: str = "127.0.0.1"
+VERSUS_PORTS: tuple[int,int] = (50505, 50506)
+SYNC_HISTORY: int = 128 # sent boards kept as delta bases
+VERSUS_LINGER: int = tick_rate # ticks the result is resent at most
+REMOTE_TILE: int = 4 # tile size of the other player's board
+
+# headless server, worker n reports metrics on SERVER_METRICS_PORT + n
+SERVER_PORT: int = 50600
+SERVER_METRICS_PORT: int = 50700
+SERVER_WRITE_LIMIT: int = 65536 # bytes queued for a client before dropping it
+SERVER_INPUT_LIMIT: int = 8 # actions a client may have waiting
+SERVER_LAG_SAMPLES: int = 1000
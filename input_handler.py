@@ -0,0 +1,223 @@
+from collections import deque
+from time import perf_counter
+from typing import Callable
+
+import pygame
+from pygame import Rect
+from pygame.event import Event
+
+import game_settings as gs
+from engine.rules import Action
+
+
+# every event type any state handles, the rest never reach the queue
+ALLOWED_EVENTS: list[int] = [pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP,
+                             pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN,
+                             pygame.MOUSEBUTTONUP, pygame.WINDOWEXPOSED,
+                             pygame.WINDOWRESIZED]
+
+# ticks before a held key starts repeating and between repeats, per action
+REPEAT_TIMING: dict[Action, tuple[int,int]] = \
+    {Action.LEFT: (gs.DAS_TICKS, gs.ARR_TICKS),
+     Action.RIGHT: (gs.DAS_TICKS, gs.ARR_TICKS),
+     Action.DOWN: (gs.SOFT_DROP_TICKS, gs.SOFT_DROP_TICKS)}
+
+
+def hit_test(pos: tuple[int,int], rects: list[Rect]) -> int:
+    """
+    Find the first rectangle that contains a point, in one pass.
+
+    :param pos: the point, usually the mouse position of an event.
+    :param rects: the rectangles to test.
+    :return: the index of the rectangle, -1 if none contains the point.
+    """
+    return Rect(pos, (1, 1)).collidelist(rects)
+
+
+class ClickTargets:
+    """Represents the clickable areas of a screen and what each one does."""
+    def __init__(self, targets: list[tuple[Rect, Callable[[], None]]]) -> None:
+        """
+        Initialize a set of click targets.
+
+        :param targets: pairs of area and the function called when it is
+        clicked, the first matching area wins.
+        """
+        self.rects: list[Rect] = [rect for rect,_ in targets]
+        self.actions: list[Callable[[], None]] = [action for _,action
+                                                  in targets]
+
+
+    def click(self, pos: tuple[int,int]) -> bool:
+        """
+        Call the action of the area under a point.
+
+        :param pos: the position of the click.
+        :return: True -> an area was clicked, False -> none was.
+        """
+        index: int = hit_test(pos, self.rects)
+        if index == -1:
+            return False
+        self.actions[index]()
+        return True
+
+
+class InputHandler:
+    """
+    Represents the event queue as seen by the states. Only the event types
+    in ALLOWED_EVENTS are queued, and mouse motion is merged into a single
+    event per frame, so handling cost does not grow with mouse movement.
+    """
+    def __init__(self) -> None:
+        """
+        Initialize the input handler and restrict the event queue.
+        """
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(ALLOWED_EVENTS)
+
+        self.events: int = 0
+        self.coalesced: int = 0
+
+
+    def poll(self, timeout: int=0) -> list[Event]:
+        """
+        Return the events of this frame in order, with every mouse motion
+        event after the first dropped and the latest motion put in place of
+        the first.
+
+        :param timeout: when the queue is empty, how long to sleep waiting
+        for an event in milliseconds, 0 -> do not wait.
+        :return: the events.
+        """
+        events: list[Event] = pygame.event.get()
+        if not events and timeout:
+            first: Event = pygame.event.wait(timeout)
+            if first.type == pygame.NOEVENT:
+                return []
+            events = [first] + pygame.event.get()
+        self.events += len(events)
+
+        result: list[Event] = []
+        motion: int = -1
+        for event in events:
+            if event.type == pygame.MOUSEMOTION:
+                if motion != -1:
+                    result[motion] = event
+                    self.coalesced += 1
+                    continue
+                motion = len(result)
+            result.append(event)
+        return result
+
+
+class KeyRepeat:
+    """
+    Represents the held movement keys. A key acts once on the tick after it
+    is pressed, then repeats after a delay at a fixed interval (delayed auto
+    shift and auto repeat rate), all counted in logic ticks so repeats stay
+    in step with the simulation whatever the framerate. Left and right
+    cancel each other, the most recent one wins. When several keys are due
+    on a tick, a new press goes first, then the key that waited longest, so
+    a soft drop repeating every tick still lets sideways moves through.
+    """
+    def __init__(self, timing: dict[Action, tuple[int,int]]=REPEAT_TIMING,
+                 samples: int=gs.LATENCY_SAMPLES) -> None:
+        """
+        Initialize with no keys held.
+
+        :param timing: the delay and interval in ticks of each action.
+        :param samples: the most latencies kept.
+        """
+        self.timing: dict[Action, tuple[int,int]] = timing
+
+        # ticks until each held action fires next, 0 -> due
+        self.held: dict[Action, int] = {}
+
+        # press time of held actions that have not fired yet
+        self.pressed_at: dict[Action, float] = {}
+        # press time of the action returned by the last next_action()
+        self.fired_press: float | None = None
+        self.latencies: deque[float] = deque(maxlen=samples)
+
+
+    def press(self, action: Action) -> None:
+        """
+        Start holding an action.
+
+        :param action: the action of the key pressed.
+        """
+        if action in (Action.LEFT, Action.RIGHT):
+            self.release(Action.RIGHT if action == Action.LEFT
+                         else Action.LEFT)
+        self.held[action] = 0
+        self.pressed_at[action] = perf_counter()
+
+
+    def release(self, action: Action) -> None:
+        """
+        Stop holding an action.
+
+        :param action: the action of the key released.
+        """
+        self.held.pop(action, None)
+        self.pressed_at.pop(action, None)
+
+
+    def clear(self) -> None:
+        """
+        Forget every held key, e.g. when the game is paused.
+        """
+        self.held.clear()
+        self.pressed_at.clear()
+        self.fired_press = None
+
+
+    def next_action(self) -> Action:
+        """
+        Advance the repeat timers by one tick and return the action due on
+        it. At most one action fires per tick, any other due action stays
+        due for the next tick and goes ahead of the one that fired.
+
+        :return: the action, NONE if nothing is due.
+        """
+        due: Action = Action.NONE
+        for action, remaining in self.held.items():
+            if remaining > 0:
+                remaining -= 1
+                self.held[action] = remaining
+            # held is ordered by last firing, a press not fired yet first
+            if remaining == 0 and (due == Action.NONE or
+                                   action in self.pressed_at and
+                                   due not in self.pressed_at):
+                due = action
+
+        self.fired_press = None
+        if due != Action.NONE:
+            delay, interval = self.timing[due]
+            self.fired_press = self.pressed_at.pop(due, None)
+            del self.held[due]
+            self.held[due] = interval if self.fired_press is None else delay
+        return due
+
+
+    def moved(self) -> None:
+        """
+        Record the input-to-move latency when the action returned by the
+        last next_action() was the first of its key press and it moved the
+        piece.
+        """
+        if self.fired_press is not None:
+            self.latencies.append((perf_counter() - self.fired_press) * 1000)
+            self.fired_press = None
+
+
+    def latency_percentiles(self) -> tuple[float, float]:
+        """
+        Return the median and 99th percentile input-to-move latency.
+
+        :return: p50 and p99 in milliseconds.
+        """
+        values: list[float] = sorted(self.latencies)
+        if not values:
+            return 0.0, 0.0
+        return values[len(values) // 2], values[int(len(values) * 0.99)]
@@ -0,0 +1,177 @@
+import atexit
+import os
+import sqlite3
+from queue import Queue
+from threading import Thread
+from time import time
+from typing import NamedTuple
+
+import game_settings as gs
+
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    pieces INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    seed INTEGER NOT NULL,
+    played_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC);
+CREATE INDEX IF NOT EXISTS scores_by_player ON scores (player, score DESC);
+"""
+
+
+# seeds are unsigned 64-bit, SQLite integers are signed
+UINT64: int = (1 << 64) - 1
+
+
+def signed(seed: int) -> int:
+    """
+    Return the signed 64-bit integer with the same bits as a seed.
+
+    :param seed: the unsigned seed.
+    :return: the value stored in the database.
+    """
+    return seed - (1 << 64) if seed >> 63 else seed
+
+
+class Entry(NamedTuple):
+    """One finished game on the leaderboard."""
+    player: str
+    score: int
+    lines: int
+    pieces: int
+    duration: float # seconds
+    seed: int
+
+
+class Snapshot(NamedTuple):
+    """The leaderboard as last read, for screens to draw from."""
+    top: tuple[Entry, ...]
+    best: int
+
+
+class Leaderboard:
+    """
+    Represents the high scores stored in SQLite. Every database call runs on
+    one background thread: finished games are queued and written in
+    batches, then the top scores and personal best are read back into a
+    snapshot that screens draw from without touching the database. Both
+    queries are served from an index, so they stay fast however many rows
+    the table holds.
+    """
+    def __init__(self, path: str=gs.LEADERBOARD_PATH,
+                 player: str=gs.PLAYER_NAME,
+                 size: int=gs.LEADERBOARD_SIZE) -> None:
+        """
+        Initialize a leaderboard that is not open yet.
+
+        :param path: the database file.
+        :param player: the name games are recorded under, and whose
+        personal best is read.
+        :param size: the number of top scores in the snapshot.
+        """
+        self.path: str = path
+        self.player: str = player
+        self.size: int = size
+
+        # entries waiting to be written, None -> stop
+        self.queue: Queue[Entry | None] = Queue()
+        self.thread: Thread | None = None
+
+        # replaced whole, never modified, so reading it needs no lock
+        self.snapshot: Snapshot = Snapshot((), 0)
+        self.written: int = 0
+
+
+    def start(self) -> None:
+        """
+        Open the database on the background thread and read the first
+        snapshot. Queued entries are written once it is open.
+        """
+        if self.thread is not None:
+            return
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+
+    def submit(self, entry: Entry) -> None:
+        """
+        Queue a finished game to be written. Never blocks.
+
+        :param entry: the game.
+        """
+        self.queue.put(entry)
+
+
+    def close(self) -> None:
+        """
+        Write everything queued and stop the background thread.
+        """
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+
+    def run(self) -> None:
+        """
+        Write queued entries in batches until close() is called, refreshing
+        the snapshot after each batch.
+        """
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection: sqlite3.Connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        self.refresh(connection)
+
+        running: bool = True
+        while running:
+            batch: list[Entry | None] = [self.queue.get()]
+            while not self.queue.empty() and \
+                    len(batch) < gs.LEADERBOARD_BATCH:
+                batch.append(self.queue.get())
+
+            entries: list[Entry] = [entry for entry in batch if entry]
+            running = len(entries) == len(batch)
+            if entries:
+                with connection:
+                    connection.executemany(
+                        "INSERT INTO scores (player, score, lines, pieces, "
+                        "duration, seed, played_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [entry._replace(seed=signed(entry.seed)) + (time(),)
+                         for entry in entries])
+                self.written += len(entries)
+                self.refresh(connection)
+        connection.close()
+
+
+    def refresh(self, connection: sqlite3.Connection) -> None:
+        """
+        Read the top scores and personal best into a new snapshot.
+
+        :param connection: the database, on the background thread.
+        """
+        rows: list[tuple] = connection.execute(
+            "SELECT player, score, lines, pieces, duration, seed "
+            "FROM scores ORDER BY score DESC LIMIT ?",
+            (self.size,)).fetchall()
+        top: list[Entry] = [Entry(*row[:-1], row[-1] & UINT64)
+                            for row in rows]
+        best: int = connection.execute(
+            "SELECT MAX(score) FROM scores WHERE player = ?",
+            (self.player,)).fetchone()[0] or 0
+        self.snapshot = Snapshot(tuple(top), best)
+
+
+# shared by every state
+leaderboard: Leaderboard = Leaderboard()
@@ -1,66 +1,200 @@
 import sys
+from threading import Thread
+from time import perf_counter
 from typing import Any
 
 import pygame
-from pygame import Surface
+from pygame import Surface, Rect
 from pygame.time import Clock
 
 import game_settings as gs
 
 from audio_handler import AudioHandler
+from asset_cache import assets
+from display import SurfaceDisplay, TextureDisplay, create_display
+from input_handler import InputHandler
+from leaderboard import leaderboard
+from profiler import CpuMeter, FrameProfiler
 
 from state_manager import StateManager
 from states.main_menu import MainMenu
 from states.main_game import Tetris
+from states.versus_game import VersusGame
 
 
 class Game:
     """Represents an instance of a class."""
     def __init__(self) -> None:
-        """Inititialize an instance of the game."""
-        pygame.init()
-        pygame.display.set_caption("Tetris")
-        self.screen: Surface = pygame.display.set_mode((gs.screen_width,
-                                                        gs.screen_height))
+        """
+        Inititialize an instance of the game. The menu is drawn as soon as
+        its own images are loaded, audio and the remaining images are loaded
+        afterwards on a worker thread.
+        """
+        start: float = perf_counter()
+
+        # only the subsystems the game uses, not all that pygame.init() starts
+        pygame.display.init()
+        pygame.font.init()
+        try:
+            pygame.mixer.init()
+        except pygame.error:
+            pass # no audio device, sound effects stay silent
+
+        self.display: SurfaceDisplay | TextureDisplay = create_display()
+        self.screen: Surface = self.display.screen
+        if isinstance(self.display, TextureDisplay):
+            # images are converted to the frame's format, not the window's
+            assets.frame = self.screen
         self.clock: Clock = pygame.time.Clock()
+        self.input_handler: InputHandler = InputHandler()
+        self.profiler: FrameProfiler = FrameProfiler()
+        self.cpu_meter: CpuMeter = CpuMeter()
 
         self.audio_handler: AudioHandler = AudioHandler()
 
         self.state_manager: StateManager = StateManager()
         self.initialize_states()
-        self.state_manager.current_state = MainMenu(self.screen, self.state_manager,
-                                                    self.audio_handler)
+        self.state_manager.change_state('main_menu')
+
+        self.state_manager.current_state.run()
+        self.display.present(None)
+        self.time_to_first_frame: float = perf_counter() - start
+
+        # scores must be written even if loading the media below fails
+        leaderboard.start()
+        self.loader: Thread = Thread(target=self.load_assets, daemon=True)
+        self.loader.start()
+
+
+    def load_assets(self) -> None:
+        """
+        Decode the sound effects and load the images the first screen did
+        not need. An image that fails here is loaded again when a state
+        first asks for it.
+        """
+        self.audio_handler.load()
+        try:
+            assets.preload(gs.ASSET_MANIFEST)
+        except (pygame.error, OSError):
+            pass # loaded on demand instead
 
 
     def run(self) -> None:
-        """Run the game loop."""
+        """
+        Run the game loop. Logic advances in fixed ticks of 1/gs.tick_rate
+        seconds whatever the framerate, so the same input plays out the same
+        way on fast and slow machines. States with nothing to simulate are
+        idle: the loop sleeps until input arrives and they only redraw what
+        the input changed.
+        """
+        tick_length: float = 1 / gs.tick_rate
+        accumulator: float = 0.0
+        previous: float = perf_counter()
+
         while True:
             self.clock.tick(gs.framerate)
-            self.check_events()
-            self.state_manager.current_state.run()
-            pygame.display.update()
 
+            state = self.state_manager.current_state
+            idle: bool = state.is_idle()
+            label: str = type(state).__name__ + (" idle" if idle else "")
+
+            # checked once per frame so a disabled profiler costs nothing
+            profiling: bool = self.profiler.enabled
+            if profiling:
+                self.profiler.start_frame()
+
+            self.check_events(gs.IDLE_TIMEOUT if idle else 0)
+            if profiling:
+                self.profiler.lap()
 
-    def check_events(self) -> None:
-        """Handle user input."""
-        for event in pygame.event.get():
+            now: float = perf_counter()
+            accumulator += now - previous
+            previous = now
+
+            # time spent idle is not owed to the simulation
+            if idle or self.state_manager.current_state.is_idle():
+                accumulator = 0.0
+
+            ticks: int = 0
+            while accumulator >= tick_length:
+                self.state_manager.current_state.tick()
+                accumulator -= tick_length
+                ticks += 1
+
+                # drop the backlog rather than spiral after a long stall
+                if ticks == gs.max_ticks_per_frame:
+                    accumulator = 0.0
+            if profiling:
+                self.profiler.lap()
+
+            dirty: list[Rect] | None = self.state_manager.current_state.run()
+            if profiling:
+                self.profiler.lap()
+                effects = getattr(self.state_manager.current_state,
+                                  "effects", None)
+                self.profiler.note = effects.summary() if effects else ""
+                overlay: Rect = self.profiler.draw_overlay(self.screen)
+                if dirty is not None:
+                    dirty = dirty + [overlay]
+
+            # states return the areas they changed, None -> the whole screen
+            self.display.present(dirty)
+
+            if profiling:
+                self.profiler.restore_screen(self.screen)
+                self.profiler.lap()
+
+            self.cpu_meter.sample(label)
+
+
+    def check_events(self, timeout: int=0) -> None:
+        """
+        Handle user input. Each event goes to the handler the current state
+        registered for its type, if there is one.
+
+        :param timeout: how long to wait for input if there is none, in
+        milliseconds.
+        """
+        for event in self.input_handler.poll(timeout):
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
 
-            self.state_manager.current_state.handle_events(event)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.profiler.toggle()
+                if not self.profiler.enabled:
+                    self.display.present([self.profiler.overlay_rect])
+                continue
+            if event.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESIZED):
+                self.display.expose()
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                self.profiler.dump_csv()
+                self.cpu_meter.dump_csv()
+                continue
+
+            # the state may change while its events are being handled
+            handler = self.state_manager.current_state.event_handlers.get(
+                event.type)
+            if handler is not None:
+                handler(event)
 
 
     def initialize_states(self) -> None:
         """
-        Save references to the different game states to the state manager.
+        Save references to the different game states to the state manager,
+        along with the arguments the states are built with.
         """
         self.main_menu: MainMenu = MainMenu
         self.main_game: Tetris = Tetris
+        self.versus_game: VersusGame = VersusGame
 
         states: dict[str, Any] = {'main_menu': self.main_menu,
-                                  'main_game': self.main_game}
+                                  'main_game': self.main_game,
+                                  'versus_game': self.versus_game}
         self.state_manager.states = states
+        self.state_manager.state_args = (self.screen, self.state_manager,
+                                         self.audio_handler)
         
 
 if __name__ == "__main__":
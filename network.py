@@ -0,0 +1,74 @@
+import socket
+
+import game_settings as gs
+
+
+class VersusLink:
+    """
+    Represents the udp connection to the other player of a versus game.
+    The link binds the first free port of gs.VERSUS_PORTS and sends to the
+    other one, so two processes on one machine pair up on their own; on a
+    LAN, set gs.VERSUS_HOST and swap the ports on one of the machines.
+    Replies from another address become the new peer.
+    """
+    def __init__(self, host: str=gs.VERSUS_HOST,
+                 ports: tuple[int,int]=gs.VERSUS_PORTS) -> None:
+        """
+        Open the socket.
+
+        :param host: the address of the other player.
+        :param ports: the two ports the players use.
+        """
+        self.socket: socket.socket = socket.socket(socket.AF_INET,
+                                                   socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        try:
+            self.socket.bind(("", ports[0]))
+            self.peer: tuple[str,int] = (host, ports[1])
+        except OSError:
+            self.socket.bind(("", ports[1]))
+            self.peer = (host, ports[0])
+
+        self.packets_sent: int = 0
+        self.packets_received: int = 0
+
+
+    def send(self, data: bytes) -> None:
+        """
+        Send a packet to the peer. Nothing is retried, the sync protocol
+        copes with lost packets.
+
+        :param data: the packet.
+        """
+        try:
+            self.socket.sendto(data, self.peer)
+            self.packets_sent += 1
+        except OSError:
+            pass # no peer listening yet
+
+
+    def receive(self) -> list[bytes]:
+        """
+        Return every packet that arrived since the last call.
+
+        :return: the packets in arrival order.
+        """
+        packets: list[bytes] = []
+        while True:
+            try:
+                data, address = self.socket.recvfrom(2048)
+            except BlockingIOError:
+                break
+            except OSError:
+                continue # an earlier send was refused
+            self.peer = address
+            packets.append(data)
+        self.packets_received += len(packets)
+        return packets
+
+
+    def close(self) -> None:
+        """
+        Close the socket.
+        """
+        self.socket.close()
@@ -0,0 +1,258 @@
+import csv
+import os
+from array import array
+from time import perf_counter, process_time
+
+import pygame
+from pygame import Surface, Rect
+from pygame.font import Font
+
+import game_settings as gs
+from asset_cache import assets
+
+
+# the phases of a frame, in the order they run
+PHASES: tuple[str, ...] = ("events", "simulation", "draw", "flip")
+# the wall time from one frame start to the next, including the sleep
+INTERVAL: int = len(PHASES)
+COLUMNS: tuple[str, ...] = PHASES + ("interval",)
+
+
+class FrameProfiler:
+    """
+    Represents per-phase frame timing kept in a fixed-size ring buffer.
+    Nothing is timed or allocated while the profiler is disabled.
+    """
+    def __init__(self, size: int=gs.PROFILER_FRAMES) -> None:
+        """
+        Initialize a disabled profiler.
+
+        :param size: the number of frames kept.
+        """
+        self.enabled: bool = False
+        self.size: int = size
+
+        # one row of COLUMNS per frame, in milliseconds
+        self.samples: array = array('d', bytes(8 * size * len(COLUMNS)))
+        self.index: int = 0
+        self.count: int = 0
+
+        self.frame_start: float = 0.0
+        self.lap_start: float = 0.0
+        self.phase: int = 0
+
+        self.font: Font | None = None
+        self.overlay: Surface | None = None
+        self.overlay_rect: Rect = Rect(4, 4, gs.PROFILER_WIDTH,
+                                       gs.PROFILER_HEIGHT)
+        self.under_overlay: Surface | None = None
+        self.stats_text: list[str] = []
+        # counters of the current state shown under the phases, e.g. effects
+        self.note: str = ""
+
+
+    def toggle(self) -> None:
+        """
+        Turn the profiler and its overlay on or off, starting a fresh
+        recording when turned on.
+        """
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.index = 0
+            self.count = 0
+            self.frame_start = 0.0
+
+
+    def start_frame(self) -> None:
+        """
+        Mark the start of a frame, before events are handled.
+        """
+        now: float = perf_counter()
+        if self.frame_start:
+            previous: int = (self.index - 1) % self.size
+            self.samples[previous * len(COLUMNS) + INTERVAL] = \
+                (now - self.frame_start) * 1000
+        self.frame_start = now
+        self.lap_start = now
+        self.phase = 0
+
+
+    def lap(self) -> None:
+        """
+        Mark the end of the current phase and the start of the next one.
+        """
+        now: float = perf_counter()
+        self.samples[self.index * len(COLUMNS) + self.phase] = \
+            (now - self.lap_start) * 1000
+        self.lap_start = now
+        self.phase += 1
+
+        if self.phase == INTERVAL:
+            self.index = (self.index + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+
+
+    def column(self, column: int) -> list[float]:
+        """
+        Return the recorded values of one column, oldest first.
+
+        :param column: the index of the column in COLUMNS.
+        :return: the values in milliseconds.
+        """
+        start: int = self.index if self.count == self.size else 0
+        return [self.samples[(start + frame) % self.size * len(COLUMNS)
+                             + column]
+                for frame in range(self.count)]
+
+
+    def percentiles(self, column: int) -> tuple[float, float]:
+        """
+        Return the median and 99th percentile of one column.
+
+        :param column: the index of the column in COLUMNS.
+        :return: p50 and p99 in milliseconds.
+        """
+        values: list[float] = sorted(self.column(column))
+        if not values:
+            return 0.0, 0.0
+        return values[len(values) // 2], values[int(len(values) * 0.99)]
+
+
+    def draw_overlay(self, screen: Surface) -> Rect:
+        """
+        Draw the frame time graph and percentiles over the screen. The
+        pixels underneath are saved so restore_screen() can put them back
+        once the frame has been displayed.
+
+        :param screen: the game screen.
+        :return: the area covered by the overlay.
+        """
+        if self.overlay is None:
+            self.font = assets.font(gs.FONT_PATH, 8)
+            self.overlay = Surface(self.overlay_rect.size)
+            self.overlay.set_alpha(200)
+            self.under_overlay = Surface(self.overlay_rect.size)
+
+        self.under_overlay.blit(screen, (0,0), self.overlay_rect)
+
+        # percentiles are re-sorted a few times a second, not every frame
+        if self.count % gs.PROFILER_STATS_INTERVAL == 1 \
+                or not self.stats_text:
+            self.stats_text = []
+            for column, name in enumerate(COLUMNS):
+                p50, p99 = self.percentiles(column)
+                self.stats_text.append(f"{name:10} {p50:5.2f} {p99:6.2f}")
+
+        self.overlay.fill(gs.BLACK)
+        y: int = 2
+        for line in ["phase  p50/p99 ms"] + self.stats_text + \
+                ([self.note] if self.note else []):
+            self.overlay.blit(self.font.render(line, False, gs.WHITE), (2, y))
+            y += 10
+
+        # frame time graph, 1 px per frame, the line marks the frame budget
+        graph_height: int = self.overlay_rect.height - y - 2
+        budget: float = 1000 / gs.framerate
+        bottom: int = self.overlay_rect.height - 2
+        pygame.draw.line(self.overlay, gs.GREY,
+                         (0, bottom - graph_height // 2),
+                         (self.overlay_rect.width, bottom - graph_height // 2))
+        frames: list[float] = self.column(INTERVAL)[-self.overlay_rect.width:]
+        for x, value in enumerate(frames):
+            height: int = min(graph_height,
+                              int(value / budget * graph_height / 2))
+            pygame.draw.line(self.overlay, gs.WHITE, (x, bottom),
+                             (x, bottom - height))
+
+        screen.blit(self.overlay, self.overlay_rect)
+        return self.overlay_rect
+
+
+    def restore_screen(self, screen: Surface) -> None:
+        """
+        Put back the pixels covered by the overlay, so states that only
+        redraw what changed never see it.
+
+        :param screen: the game screen.
+        """
+        screen.blit(self.under_overlay, self.overlay_rect)
+
+
+    def dump_csv(self, path: str=gs.PROFILER_CSV_PATH) -> None:
+        """
+        Write every recorded frame to a csv file, oldest first.
+
+        :param path: the file path.
+        """
+        directory: str = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        columns: list[list[float]] = [self.column(column)
+                                      for column in range(len(COLUMNS))]
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(("frame",) + COLUMNS)
+            for frame, row in enumerate(zip(*columns)):
+                writer.writerow([frame] + [f"{value:.4f}" for value in row])
+
+
+class CpuMeter:
+    """
+    Represents the processor time used by each state, as a share of the
+    wall time spent in it.
+    """
+    def __init__(self) -> None:
+        """
+        Initialize a meter with nothing recorded.
+        """
+        # processor and wall seconds keyed by state label
+        self.usage: dict[str, list[float]] = {}
+        self.cpu: float = process_time()
+        self.wall: float = perf_counter()
+
+
+    def sample(self, label: str) -> None:
+        """
+        Add the time since the previous sample to a state.
+
+        :param label: the state the time was spent in.
+        """
+        cpu: float = process_time()
+        wall: float = perf_counter()
+        entry: list[float] | None = self.usage.get(label)
+        if entry is None:
+            entry = self.usage[label] = [0.0, 0.0]
+        entry[0] += cpu - self.cpu
+        entry[1] += wall - self.wall
+        self.cpu = cpu
+        self.wall = wall
+
+
+    def percentages(self) -> dict[str, float]:
+        """
+        Return the processor use of each state.
+
+        :return: percentages of one core keyed by state label.
+        """
+        return {label: cpu / wall * 100 if wall else 0.0
+                for label, (cpu, wall) in self.usage.items()}
+
+
+    def dump_csv(self, path: str=gs.CPU_CSV_PATH) -> None:
+        """
+        Write the processor use of each state to a csv file.
+
+        :param path: the file path.
+        """
+        directory: str = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(("state", "cpu_seconds", "wall_seconds",
+                             "cpu_percent"))
+            for label, (cpu, wall) in self.usage.items():
+                writer.writerow([label, f"{cpu:.3f}", f"{wall:.3f}",
+                                 f"{cpu / wall * 100 if wall else 0.0:.1f}"])
@@ -0,0 +1,348 @@
+"""
+Host many headless Tetris sessions for network clients, without a display.
+
+    python server.py --workers 4
+    python server.py --port 50600 --metrics-port 50700 --workers 1
+
+Each client connection plays its own game. Clients send one byte per
+action, the values of engine.rules.Action. After every tick that changed
+their game they receive an engine.sync.BoardSync packet behind a two-byte
+length; the connection is closed after the packet reporting game over.
+
+Gravity for every session runs on one timer task per worker process, so
+the cost of a tick is one pass over the sessions. Connecting to the
+metrics port returns one line of json: the session count, tick lag and
+CPU time per session.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import struct
+from collections import deque
+from statistics import mean
+from time import thread_time_ns
+from typing import Any
+
+import game_settings as gs
+from engine.randomizer import PieceGenerator
+from engine.rules import Action, StepResult, TetrisEngine
+from engine.sync import BoardSync
+
+
+# the length in front of every packet sent to a client
+LENGTH: struct.Struct = struct.Struct("<H")
+
+
+class Session:
+    """
+    Represents one headless game and the connection of the client playing
+    it.
+    """
+    def __init__(self, number: int, writer: asyncio.StreamWriter | None,
+                 seed: int | None=None) -> None:
+        """
+        Initialize a session with a new game.
+
+        :param number: the id of the session in its worker.
+        :param writer: the stream to the client, None -> nobody is sent
+        anything, e.g. when benchmarking.
+        :param seed: the seed of the piece generator, random if omitted.
+        """
+        self.number: int = number
+        self.writer: asyncio.StreamWriter | None = writer
+        self.engine: TetrisEngine = TetrisEngine(
+            PieceGenerator(seed, gs.PIECE_GENERATOR))
+        self.sync: BoardSync = BoardSync(number)
+
+        # input waiting to be applied, one action per tick like the game
+        self.actions: deque[Action] = deque()
+        self.input_limit: int = gs.SERVER_INPUT_LIMIT
+
+        # CPU time spent on this session's ticks
+        self.cpu_ns: int = 0
+
+
+    def queue(self, data: bytes) -> None:
+        """
+        Queue the actions a client sent, ignoring unknown values and any
+        beyond gs.SERVER_INPUT_LIMIT waiting actions.
+
+        :param data: one byte per action.
+        """
+        for value in data:
+            if len(self.actions) >= self.input_limit:
+                break
+            if Action.NONE < value <= Action.SOFT_DROP:
+                self.actions.append(Action(value))
+
+
+    def input_full(self) -> bool:
+        """
+        Check whether the session cannot take more input for now.
+
+        :return: True -> gs.SERVER_INPUT_LIMIT actions are waiting.
+        """
+        return len(self.actions) >= self.input_limit
+
+
+    def tick(self) -> bytes | None:
+        """
+        Advance the game by one logic tick.
+
+        :return: the packet for the client, None if nothing it can see
+        changed.
+        """
+        action: Action = self.actions.popleft() if self.actions \
+            else Action.NONE
+        result: StepResult = self.engine.tick(action)
+        if not (result.moved or result.locked or result.game_over):
+            return None
+
+        packet: bytes = self.sync.encode(self.engine)
+        # the stream is reliable, the client never has to ack
+        self.sync.delivered()
+        return LENGTH.pack(len(packet)) + packet
+
+
+class GameServer:
+    """
+    Represents the sessions of one worker process, all advanced by a single
+    timer on the worker's event loop.
+    """
+    def __init__(self, tick_rate: int=gs.tick_rate) -> None:
+        """
+        Initialize a server with no sessions.
+
+        :param tick_rate: the logic ticks per second of every session.
+        """
+        self.tick_length: float = 1 / tick_rate
+        self.sessions: dict[int, Session] = {}
+        self.next_number: int = 0
+
+        # metrics
+        self.ticks: int = 0
+        self.skipped: int = 0
+        self.finished: int = 0
+        self.lag: deque[float] = deque(maxlen=gs.SERVER_LAG_SAMPLES)
+        self.tick_cpu: deque[int] = deque(maxlen=gs.SERVER_LAG_SAMPLES)
+
+
+    def add_session(self, writer: asyncio.StreamWriter | None,
+                    seed: int | None=None) -> Session:
+        """
+        Start a new session.
+
+        :param writer: the stream to the client.
+        :param seed: the seed of the piece generator, random if omitted.
+        :return: the session.
+        """
+        self.next_number += 1
+        session: Session = Session(self.next_number, writer, seed)
+        self.sessions[session.number] = session
+        return session
+
+
+    def end_session(self, session: Session) -> None:
+        """
+        Forget a session and close its connection.
+
+        :param session: the session.
+        """
+        if self.sessions.pop(session.number, None) is None:
+            return
+        self.finished += 1
+        if session.writer is not None:
+            session.writer.close()
+
+
+    def tick(self) -> None:
+        """
+        Advance every session by one logic tick and send what changed.
+        Clients that stop reading are dropped once gs.SERVER_WRITE_LIMIT
+        bytes are queued for them.
+        """
+        start: int = thread_time_ns()
+        for session in list(self.sessions.values()):
+            session_start: int = thread_time_ns()
+            packet: bytes | None = session.tick()
+            writer: asyncio.StreamWriter | None = session.writer
+            if packet is not None and writer is not None:
+                writer.write(packet)
+            session.cpu_ns += thread_time_ns() - session_start
+
+            if session.engine.game_over or writer is not None and \
+                    writer.transport.get_write_buffer_size() > \
+                    gs.SERVER_WRITE_LIMIT:
+                self.end_session(session)
+
+        self.ticks += 1
+        self.tick_cpu.append(thread_time_ns() - start)
+
+
+    async def run_ticks(self) -> None:
+        """
+        Tick the sessions at the tick rate, catching up on late ticks up to
+        gs.max_ticks_per_frame at a time and skipping the rest.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        due: float = loop.time()
+        while True:
+            due += self.tick_length
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            self.lag.append(loop.time() - due)
+            self.tick()
+
+            # catch up on ticks the sleep overran, dropping a long backlog
+            ticks: int = 1
+            while loop.time() >= due + self.tick_length:
+                if ticks == gs.max_ticks_per_frame:
+                    behind: int = int((loop.time() - due) / self.tick_length)
+                    self.skipped += behind
+                    due += behind * self.tick_length
+                    break
+                due += self.tick_length
+                self.lag.append(loop.time() - due)
+                self.tick()
+                ticks += 1
+
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        """
+        Play a session for a connected client until the game ends or the
+        client disconnects. Nothing is read while the session's input is
+        full, so a client sending faster than the ticks consume is held
+        back by the connection instead of queueing without bound.
+
+        :param reader: the stream from the client.
+        :param writer: the stream to the client.
+        """
+        writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP,
+                                                   socket.TCP_NODELAY, 1)
+        session: Session = self.add_session(writer)
+        try:
+            while session.number in self.sessions:
+                if session.input_full():
+                    await asyncio.sleep(self.tick_length)
+                    continue
+                data: bytes = await reader.read(session.input_limit -
+                                                len(session.actions))
+                if not data:
+                    break
+                session.queue(data)
+        except ConnectionError:
+            pass
+        finally:
+            self.end_session(session)
+
+
+    async def handle_metrics(self, reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter) -> None:
+        """
+        Send the metrics as one line of json and close the connection.
+
+        :param reader: the stream from the client, unused.
+        :param writer: the stream to the client.
+        """
+        writer.write(json.dumps(self.metrics()).encode() + b"\n")
+        await writer.drain()
+        writer.close()
+
+
+    def metrics(self) -> dict[str, Any]:
+        """
+        Return the state of the server.
+
+        :return: the session count, tick lag in milliseconds, CPU time per
+        tick in microseconds and the CPU time of every session in
+        milliseconds.
+        """
+        lag: list[float] = sorted(self.lag) or [0.0]
+        return {'sessions': len(self.sessions),
+                'finished': self.finished,
+                'ticks': self.ticks,
+                'skipped_ticks': self.skipped,
+                'tick_lag_ms': {'p50': lag[len(lag) // 2] * 1000,
+                                'p99': lag[int(len(lag) * 0.99)] * 1000,
+                                'max': lag[-1] * 1000},
+                'tick_cpu_us': mean(self.tick_cpu) / 1000 if self.tick_cpu
+                               else 0.0,
+                'session_cpu_ms': {number: session.cpu_ns / 1e6
+                                   for number, session
+                                   in self.sessions.items()}}
+
+
+    async def serve(self, host: str, port: int, metrics_port: int,
+                    reuse_port: bool=False) -> None:
+        """
+        Accept clients and tick their sessions until cancelled.
+
+        :param host: the address to listen on.
+        :param port: the port clients connect to.
+        :param metrics_port: the port serving the metrics.
+        :param reuse_port: let several workers listen on the same port.
+        """
+        game: asyncio.Server = await asyncio.start_server(
+            self.handle_client, host, port, reuse_port=reuse_port)
+        metrics: asyncio.Server = await asyncio.start_server(
+            self.handle_metrics, host, metrics_port)
+        async with game, metrics:
+            await self.run_ticks()
+
+
+def run_worker(index: int, host: str, port: int, metrics_port: int,
+               reuse_port: bool) -> None:
+    """
+    Run one server on its own event loop.
+
+    :param index: the number of the worker, offsets its metrics port.
+    :param host: the address to listen on.
+    :param port: the port clients connect to, shared by every worker.
+    :param metrics_port: the metrics port of the first worker.
+    :param reuse_port: let several workers listen on the same port.
+    """
+    try:
+        asyncio.run(GameServer().serve(host, port, metrics_port + index,
+                                       reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> None:
+    """
+    Start the workers. With more than one, the kernel spreads the clients
+    over them through SO_REUSEPORT, where the platform supports it.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=gs.SERVER_PORT)
+    parser.add_argument("--metrics-port", type=int,
+                        default=gs.SERVER_METRICS_PORT)
+    parser.add_argument("--workers", type=int,
+                        default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    workers: int = args.workers if hasattr(socket, "SO_REUSEPORT") else 1
+    if workers == 1:
+        run_worker(0, args.host, args.port, args.metrics_port, False)
+        return
+
+    processes: list[multiprocessing.Process] = \
+        [multiprocessing.Process(target=run_worker,
+                                 args=(index, args.host, args.port,
+                                       args.metrics_port, True))
+         for index in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
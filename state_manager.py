@@ -1,8 +1,15 @@
+from threading import Lock, Thread
 from typing import Any
 
 
 class StateManager:
-    """Represents an instance of the state manager."""
+    """
+    Represents an instance of the state manager. States are built once and
+    kept in a pool, so changing state only calls the exit() hook of the old
+    state and the enter() hook of the new one. Each state may name the state
+    it is likely to hand over to in next_state, which is then built in the
+    background while the current one is shown.
+    """
     def __init__(self) -> None:
         """
         Initialize an instance of the state manager.
@@ -10,27 +17,96 @@ class StateManager:
         self.current_state: Any = None
         self.states: dict[str, Any] = {}
 
+        # the arguments every state class is constructed with
+        self.state_args: tuple = ()
+
+        # live state objects keyed by name
+        self.instances: dict[str, Any] = {}
+        self.instances_lock: Lock = Lock()
+        self.prefetch_thread: Thread | None = None
+
 
     def set_state(self, state: Any) -> None:
         """
         Set a given state as the current state.
-        
+
         :param state: an instance of a state class.
         """
-        self.current_state = state  
+        self.current_state = state
 
 
     def get_state(self, state_name: str) -> Any:
         """
         Return the a specified state class.
-        
+
         :param state_name: the string key that indentifies the state class
         in the states dictionary.
         :return: the given state.
         """
 
         return self.states[state_name]
-        
+
+
+    def get_instance(self, state_name: str) -> Any:
+        """
+        Return the live object of a state, building it on first use. If the
+        state is being built in the background, wait for it instead of
+        building a second one.
+
+        :param state_name: the string key that identifies the state class in
+        the states dictionary.
+        :return: the state object.
+        """
+        with self.instances_lock:
+            state: Any = self.instances.get(state_name)
+            if state is None:
+                state = self.states[state_name](*self.state_args)
+                self.instances[state_name] = state
+            return state
+
+
+    def change_state(self, state_name: str) -> None:
+        """
+        Make a pooled state the current state, then start building the state
+        it is likely to hand over to.
+
+        :param state_name: the string key that identifies the state class in
+        the states dictionary.
+        """
+        if self.current_state is not None:
+            self.current_state.exit()
+
+        self.current_state = self.get_instance(state_name)
+        self.current_state.enter()
+
+        next_state: str | None = getattr(self.current_state, "next_state",
+                                         None)
+        if next_state:
+            self.prefetch(next_state)
+
+
+    def prefetch(self, state_name: str) -> None:
+        """
+        Build a state on a background thread, if it is not built already.
+
+        :param state_name: the string key that identifies the state class in
+        the states dictionary.
+        """
+        if state_name in self.instances:
+            return
+        self.prefetch_thread = Thread(target=self.get_instance,
+                                      args=(state_name,), daemon=True)
+        self.prefetch_thread.start()
+
+
+    def wait_for_prefetch(self) -> None:
+        """
+        Block until any background build has finished.
+        """
+        if self.prefetch_thread is not None:
+            self.prefetch_thread.join()
+            self.prefetch_thread = None
+
 
     def get_current_state(self) -> Any:
         """
@@ -38,4 +114,4 @@ class StateManager:
 
         :return: the current state.
         """
-        return self.current_state  
+        return self.current_state
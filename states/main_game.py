@@ -1,25 +1,50 @@
-import random as rng
-from typing import Literal
+import os
+from collections import deque
+from typing import Callable
 
 import pygame
-from pygame import Vector2
 from pygame import Surface, Rect
 from pygame.event import Event
-from pygame.sprite import Sprite, Group
 from pygame.font import Font
 
 import game_settings as gs
 from state_manager import StateManager
 from audio_handler import AudioHandler
+from asset_cache import assets
+from effects import Effects
+from input_handler import ClickTargets, KeyRepeat, hit_test
+from leaderboard import Entry, leaderboard
+from engine.board import Board
+from engine.bot import Bot
+from engine.pieces import Piece
+from engine.randomizer import PieceGenerator
+from engine.replay import Replay
+from engine.rules import TetrisEngine, Action, StepResult
+from engine.snapshot import Rewind, pack_state, unpack_state
+
+
+# the action queued once by each game key
+KEY_ACTIONS: dict[int, Action] = {pygame.K_SPACE: Action.ROTATE}
+
+# the action repeated while each movement key is held
+REPEAT_KEYS: dict[int, Action] = {pygame.K_LEFT: Action.LEFT,
+                                  pygame.K_RIGHT: Action.RIGHT,
+                                  pygame.K_DOWN: Action.DOWN}
 
 
 ### GAME STATE CLASS ###
 class Tetris:
     """Represents the tetris game state."""
+    # the state the game usually hands over to, built in the background
+    next_state: str = "main_menu"
+    # whether the game may be rewound, saved and loaded
+    allow_rewind: bool = True
+
     def __init__(self, screen: Surface, state_manager: StateManager,
                  audio_handler: AudioHandler) -> None:
         """
-        Initialize an instance of the tetris game scene.
+        Initialize an instance of the tetris game scene. Everything that
+        outlives a single game is built here, the game itself in reset().
 
         :param screen: the game screen.
         :param state_manager: a reference to the state manager.
@@ -29,128 +54,499 @@ class Tetris:
         self.audio_handler: AudioHandler = audio_handler
 
         self.bg_color: tuple[int,int,int] = gs.DARKBLUE
-        self.ui_font: Font = pygame.font.Font("assets/fonts/gameboy.ttf", 20)
+        self.ui_font: Font = assets.font(gs.FONT_PATH, 20)
+        self.block_image: Surface = assets.image("assets/game/block.png")
+
+        self.create_background()
+        self.create_pause_screen()
+        self.create_end_screen()
+
+        # handlers keyed by event type, other events are ignored
+        self.event_handlers: dict[int, Callable[[Event], None]] = \
+            {pygame.KEYDOWN: self.key_down,
+             pygame.KEYUP: self.key_up,
+             pygame.MOUSEMOTION: self.mouse_motion,
+             pygame.MOUSEBUTTONDOWN: self.mouse_down}
 
-        self.score: int = 0
+        # held movement keys, kept across games for the latency record
+        self.keys: KeyRepeat = KeyRepeat()
+
+        # the quick save slot, F5 saves and F9 loads
+        self.saved_state: bytes | None = None
+
+        # particles over the field, the pool is reused by every game
+        self.effects: Effects = Effects(self.block_image, self.field_rect)
+
+        self.reset()
+
+
+    def reset(self) -> None:
+        """
+        Start a new game, keeping the pre-rendered screens.
+        """
         self.final_score: int = 0
 
-        self.set_timer()
+        # the rules live in the engine, this state only renders them
+        generator: PieceGenerator = PieceGenerator(mode=gs.PIECE_GENERATOR)
+        self.engine: TetrisEngine = TetrisEngine(generator)
+        self.replay: Replay = Replay(generator.seed, generator.mode)
+        # a loaded game cannot be replayed from its seed
+        self.recording: bool = True
+
+        # recent history, scrubbed back while backspace is held
+        self.rewind: Rewind = Rewind()
+        self.rewinding: bool = False
 
-        self.block_group: Group = Group()
-        self.field_array: list[list[Block | Literal[0]]] = \
-            self.get_field_array()
-        self.tetromino: Tetronimo = Tetronimo(screen, self.block_group, self)
-        self.next_tetronimo: Tetronimo = \
-            Tetronimo(screen, self.block_group, self, False)
+        # input waiting to be applied on the next logic ticks
+        self.actions: deque[Action] = deque()
+        self.keys.clear()
+
+        # computer player for demos, toggled with F2
+        self.bot: Bot | None = None
+
+        self.tetromino: Tetronimo = Tetronimo(self.screen, self.block_image,
+                                              self.engine.piece)
 
         self.game_paused: bool = False
         self.game_over: bool = False
-        self.create_pause_screen()
-        self.create_end_screen()
+        self.effects.clear()
+        self.rebuild_stack()
 
+        # dirty rectangle tracking
+        self.redraw: bool = True
+        self.field_changed: bool = False
+        self.stack_stale: bool = False
+        self.piece_rect: Rect = self.get_piece_rect()
+        # particles were drawn last frame and must be erased
+        self.effects_shown: bool = False
 
-    def run(self) -> None:
+        # the pause and game over screens only change on input
+        self.overlay_changed: bool = True
+        self.hovered: int = -1
+        self.mouse_pos: tuple[int,int] = (-1, -1)
+
+
+    def enter(self) -> None:
         """
-        Run the tetris game state.
+        Called when the game becomes the current state. Every visit from
+        the menu plays a new game.
         """
-        if not self.game_over:
-            self.screen.fill(self.bg_color)
-            self.draw_grid()
-            self.draw_ui()
-        
-            if not self.game_paused:
-                pygame.mouse.set_visible(False)
+        self.reset()
 
-                self.block_group.update()
 
-                self.check_tetronimo_landed()
+    def exit(self) -> None:
+        """
+        Called when another state replaces the game.
+        """
+        pygame.mouse.set_visible(True)
 
-                self.check_full_lines()
 
-            for block in self.block_group.sprites():
-                block.draw_block()
+    def run(self) -> list[Rect] | None:
+        """
+        Run the tetris game state.
+
+        :return: the areas of the screen that changed, None -> all of it.
+        """
+        # the game over screen waits for the last particles
+        if self.game_over and not self.effects.count or self.game_paused:
+            pygame.mouse.set_visible(True)
+            if not self.overlay_changed:
+                return []
+            self.overlay_changed = False
+            self.hovered = hit_test(self.mouse_pos, self.option_rects())
 
-            if self.game_paused:
-                pygame.mouse.set_visible(True)
+            if self.game_over:
+                self.display_end_screen()
+            else:
+                self.draw_frame()
                 self.display_pause_screen()
-        
+            # the overlay is covered in full once play resumes
+            self.redraw = True
+            return None
+
+        pygame.mouse.set_visible(False)
+
+        old_rect: Rect = self.piece_rect
+        self.piece_rect = self.get_piece_rect()
+
+        # rewinding may go back any number of locks, rebuilt once a frame
+        if self.stack_stale:
+            self.rebuild_stack()
+            self.stack_stale = False
+            self.field_changed = True
+
+        if self.redraw:
+            self.draw_frame()
+            self.redraw = False
+            self.field_changed = False
+            dirty: list[Rect] = [self.screen.get_rect()]
+        elif self.field_changed:
+            self.draw_frame()
+            self.field_changed = False
+            dirty = [self.field_rect, self.next_box, self.score_box]
+        elif self.effects.count or self.effects_shown:
+            # particles may be anywhere on the field, redrawn under them
+            self.screen.blit(self.stack, self.field_rect)
+            self.tetromino.draw()
+            dirty = [self.field_rect]
+        else:
+            return self.draw_piece(old_rect)
+
+        self.effects_shown = self.effects.draw(self.screen)
+        return dirty
+
+
+    def draw_piece(self, old_rect: Rect) -> list[Rect]:
+        """
+        Move the falling piece, redrawing only the areas it left and entered.
+
+        :param old_rect: the area the piece covered last frame.
+        :return: the areas of the screen that changed.
+        """
+        if old_rect == self.piece_rect:
+            return []
+
+        dirty: list[Rect] = [rect for rect in (old_rect, self.piece_rect)
+                             if rect.width]
+        for rect in dirty:
+            self.screen.blit(self.stack, rect,
+                             rect.move(-gs.grid_start_x, -gs.grid_start_y))
+        self.tetromino.draw()
+        return dirty
+
+
+    def draw_frame(self) -> None:
+        """
+        Draw the background, ui, landed blocks and falling piece.
+        """
+        self.screen.blit(self.background, (0,0))
+        self.draw_ui()
+        self.screen.blit(self.stack, self.field_rect)
+        self.tetromino.draw()
+
+
+    def key_down(self, event: Event) -> None:
+        """
+        Queue the action of a game key, or toggle the pause screen.
+
+        :param event: the key event.
+        """
         if self.game_over:
-            pygame.mouse.set_visible(True)
-            self.display_end_screen()
+            return
+
+        if not self.game_paused:
+            if event.key in REPEAT_KEYS:
+                self.keys.press(REPEAT_KEYS[event.key])
+            elif event.key in KEY_ACTIONS:
+                self.actions.append(KEY_ACTIONS[event.key])
+            elif event.key == pygame.K_F2:
+                self.bot = None if self.bot else Bot()
+            elif self.allow_rewind and event.key == pygame.K_BACKSPACE:
+                self.rewinding = True
+                self.actions.clear()
+                self.keys.clear()
+            elif self.allow_rewind and event.key == pygame.K_F5:
+                self.save_state()
+            elif self.allow_rewind and event.key == pygame.K_F9:
+                self.load_state()
+
+        if event.key == pygame.K_ESCAPE:
+            self.audio_handler.pause_click.play()
+            self.game_paused = not self.game_paused
+            self.overlay_changed = True
+            self.keys.clear()
+            self.rewinding = False
 
 
-    def handle_events(self, event: Event) -> None:
+    def key_up(self, event: Event) -> None:
         """
-        Handle user input.
+        Stop repeating the action of a released movement key, or stop
+        rewinding.
 
-        :param event: the given user event.
+        :param event: the key event.
         """
-        if event.type == pygame.KEYDOWN and not self.game_over:
-            if not self.game_paused:
-                if event.key == pygame.K_LEFT:
-                    self.tetromino.move('left')
-                if event.key == pygame.K_RIGHT:
-                    self.tetromino.move('right')
-                if event.key == pygame.K_SPACE:
-                    self.tetromino.rotate()
-                if event.key == pygame.K_DOWN:
-                    pygame.time.set_timer(self.user_event,
-                                          gs.FAST_TIME_INTERVAL)
+        if event.key in REPEAT_KEYS:
+            self.keys.release(REPEAT_KEYS[event.key])
+        elif event.key == pygame.K_BACKSPACE:
+            self.rewinding = False
 
-            if event.key == pygame.K_ESCAPE:
-                self.audio_handler.pause_click.play()
-                self.game_paused = not self.game_paused
-        
-        if event.type == self.user_event and not self.game_paused:
-            self.tetromino.update()
-
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            pos: tuple[int,int] = pygame.mouse.get_pos()
-
-            if self.game_paused:
-                if self.resume_alt_rect.collidepoint(pos):
-                    self.game_paused = False
-                    self.audio_handler.pause_click.play()
-                elif self.menu_alt_rect.collidepoint(pos):
-                    self.audio_handler.pause_click.play()
-                    menu_class = self.state_manager.get_state("main_menu")
-                    self.state_manager.set_state(menu_class(self.screen,
-                                                        self.state_manager,
-                                                        self.audio_handler))
-            
-            if self.game_over:
-                if self.again_alt_rect.collidepoint(pos):
-                    self.audio_handler.pause_click.play()
-                    self.reset_game()
-                elif self.main_alt_rect.collidepoint(pos):
-                    self.audio_handler.pause_click.play()
-                    menu_class = self.state_manager.get_state("main_menu")
-                    self.state_manager.set_state(menu_class(self.screen,
-                                                        self.state_manager,
-                                                        self.audio_handler))
-                    
 
-    def reset_game(self) -> None:
+    def mouse_motion(self, event: Event) -> None:
+        """
+        Redraw the pause or game over screen when the mouse moves onto or off
+        an option.
+
+        :param event: the mouse motion event.
+        """
+        self.mouse_pos = event.pos
+        if not (self.game_over or self.game_paused):
+            return
+
+        hovered: int = hit_test(event.pos, self.option_rects())
+        if hovered != self.hovered:
+            self.hovered = hovered
+            self.overlay_changed = True
+
+
+    def option_rects(self) -> list[Rect]:
+        """
+        Return the areas of the options on the pause or game over screen,
+        whichever is showing.
+
+        :return: the option areas, in the order they are drawn.
+        """
+        if self.game_over:
+            return [self.again_rect, self.main_rect]
+        return [self.resume_rect, self.menu_rect]
+
+
+    def mouse_down(self, event: Event) -> None:
+        """
+        Click the option under the mouse on the pause or game over screen.
+
+        :param event: the mouse button event.
+        """
+        if self.game_over:
+            self.end_targets.click(event.pos)
+        elif self.game_paused:
+            self.pause_targets.click(event.pos)
+
+
+    def resume(self) -> None:
+        """
+        Close the pause screen.
+        """
+        self.game_paused = False
+        self.overlay_changed = True
+        self.audio_handler.pause_click.play()
+
+
+    def quit_to_menu(self) -> None:
+        """
+        Leave a paused game for the main menu.
+        """
+        self.audio_handler.pause_click.play()
+        self.save_replay()
+        self.state_manager.change_state("main_menu")
+
+
+    def play_again(self) -> None:
+        """
+        Start a new game from the game over screen.
+        """
+        self.audio_handler.pause_click.play()
+        self.reset()
+
+
+    def return_to_menu(self) -> None:
+        """
+        Go back to the main menu from the game over screen.
+        """
+        self.audio_handler.pause_click.play()
+        self.state_manager.change_state("main_menu")
+
+
+    @property
+    def score(self) -> int:
+        """
+        Return the score of the current game.
+
+        :return: the score.
         """
-        Start a new game.
+        return self.engine.score
+
+
+    def is_idle(self) -> bool:
+        """
+        Check whether the game can wait for input instead of running frames.
+
+        :return: True -> paused or over, False -> playing or particles are
+        still moving.
+        """
+        return self.game_paused or self.game_over and not self.effects.count
+
+
+    def tick(self) -> None:
+        """
+        Advance the game by one fixed-length logic tick, applying at most one
+        action: a queued one, else whichever held key is due.
         """
-        self.__init__(self.screen, self.state_manager, self.audio_handler)
-            
+        if self.game_paused:
+            return
+        self.effects.update()
+        if self.game_over:
+            return
+
+        if self.rewinding:
+            if self.rewind.rewind(self.engine, gs.REWIND_SPEED):
+                self.replay.truncate(self.engine.ticks)
+                self.restored()
+            return
+
+        if self.bot and not self.actions:
+            self.actions.append(self.bot.next_action(self.engine))
+
+        # held keys wait a tick for a queued press
+        held: bool = not self.actions
+        action: Action = self.keys.next_action() if held \
+            else self.actions.popleft()
+        self.replay.record(self.engine.ticks, action)
+        self.rewind.record(self.engine, action)
 
-    def draw_grid(self) -> None:
+        result: StepResult = self.engine.tick(action)
+        if held and result.moved:
+            self.keys.moved()
+        self.handle_result(result)
+
+
+    def handle_result(self, result: StepResult) -> None:
         """
-        Draw the playing area to the screen.
+        React to the outcome of an engine tick.
+
+        :param result: the result reported by the engine.
+        """
+        if result.game_over:
+            self.end_game()
+        elif result.locked:
+            self.audio_handler.landed.play()
+            self.effects.lock(self.engine.locked_cells)
+            if result.lines_cleared:
+                self.audio_handler.full_line.play()
+                self.effects.line_clear(self.engine.board.cleared_rows,
+                                        self.engine.board.width)
+            self.field_changed = True
+            self.update_stack(result)
+            self.tetromino.piece = self.engine.piece
+
+
+    def save_state(self) -> None:
+        """
+        Save the game to the quick save slot and gs.SAVE_STATE_PATH.
+        """
+        self.audio_handler.pause_click.play()
+        self.saved_state = pack_state(self.engine)
+        os.makedirs(os.path.dirname(gs.SAVE_STATE_PATH), exist_ok=True)
+        with open(gs.SAVE_STATE_PATH, "wb") as file:
+            file.write(self.saved_state)
+
+
+    def load_state(self) -> None:
+        """
+        Continue from the quick save slot, or from gs.SAVE_STATE_PATH if
+        nothing was saved since the game started. A file that is damaged,
+        from another version or for another board size is ignored.
+        """
+        if self.saved_state is None:
+            if not os.path.exists(gs.SAVE_STATE_PATH):
+                return
+            with open(gs.SAVE_STATE_PATH, "rb") as file:
+                self.saved_state = file.read()
+
+        try:
+            unpack_state(self.engine, self.saved_state)
+        except ValueError:
+            self.saved_state = None
+            return
+
+        self.audio_handler.pause_click.play()
+        self.rewind.clear()
+        self.recording = False
+        self.restored()
+
+
+    def restored(self) -> None:
+        """
+        Show the game after the engine was rewound or loaded.
+        """
+        self.tetromino.piece = self.engine.piece
+        self.actions.clear()
+        self.effects.clear()
+        if self.bot:
+            self.bot = Bot()
+        self.stack_stale = True
+
+
+    def end_game(self) -> None:
+        """
+        Show the game over screen and record the finished game.
+        """
+        self.final_score = self.score
+        self.game_over = True
+        self.overlay_changed = True
+        self.effects.game_over(self.engine.board)
+        self.save_replay()
+
+        engine: TetrisEngine = self.engine
+        leaderboard.submit(Entry(leaderboard.player, engine.score,
+                                 engine.lines, engine.pieces,
+                                 engine.ticks / gs.tick_rate,
+                                 engine.generator.seed))
+
+
+    def save_replay(self) -> None:
+        """
+        Write the replay of the current game to gs.REPLAY_PATH.
+        """
+        if not gs.SAVE_REPLAYS or not self.recording:
+            return
+        os.makedirs(os.path.dirname(gs.REPLAY_PATH), exist_ok=True)
+        self.replay.save(gs.REPLAY_PATH)
+
+
+    def create_background(self) -> None:
+        """
+        Pre-render everything that never changes during a game: the
+        background colour, the grid, its border and the ui boxes and labels.
+        """
+        self.background: Surface = Surface((gs.screen_width,
+                                            gs.screen_height), 0, self.screen)
+        self.background.fill(self.bg_color)
+        self.draw_grid(self.background)
+
+        self.field_rect: Rect = Rect(gs.grid_start_x, gs.grid_start_y,
+                                     gs.tile_size * gs.grid_width,
+                                     gs.tile_size * gs.grid_height)
+
+        # next block box
+        next_text_image: Surface = assets.text(self.ui_font, "NEXT", True,
+                                               gs.WHITE)
+        next_text_rect: Rect = next_text_image.get_rect(center=(317, 80))
+        self.background.blit(next_text_image, next_text_rect)
+
+        self.next_box: Rect = Rect(0,0, 100, 100)
+        self.next_box.center = (315, 150)
+        pygame.draw.rect(self.background, gs.WHITE, self.next_box, 2, 7)
+
+        # score box
+        score_text_image: Surface = assets.text(self.ui_font, "SCORE", True,
+                                                gs.WHITE)
+        score_text_rect: Rect = score_text_image.get_rect(center=(317, 305))
+        self.background.blit(score_text_image, score_text_rect)
+
+        self.score_box: Rect = Rect(0,0, 120, 70)
+        self.score_box.center = (315, 360)
+        pygame.draw.rect(self.background, gs.WHITE, self.score_box, 2, 7)
+
+        # the grid with every landed block, redrawn only when a piece locks
+        self.stack: Surface = Surface(self.field_rect.size, 0, self.screen)
+
+
+    def draw_grid(self, surface: Surface) -> None:
+        """
+        Draw the playing area.
+
+        :param surface: the surface to draw onto.
         """
         for col in range(gs.grid_width):
             for row in range(gs.grid_height):
                 col_pos: int = col * gs.tile_size + gs.grid_start_x
                 row_pos: int = row * gs.tile_size + gs.grid_start_y
 
-                pygame.draw.rect(self.screen, gs.GREY,
+                pygame.draw.rect(surface, gs.GREY,
                                  (col_pos, row_pos, gs.tile_size,
                                   gs.tile_size), 1)
                 
-        pygame.draw.rect(self.screen, gs.WHITE,
+        pygame.draw.rect(surface, gs.WHITE,
                          (gs.grid_start_x, gs.grid_start_y,
                          gs.tile_size * gs.grid_width,
                          gs.tile_size * gs.grid_height), 2)
@@ -170,72 +566,81 @@ class Tetris:
         """
         self.end_screen: Surface = Surface((gs.screen_width,
                                             gs.screen_height))
+        self.end_screen.fill(gs.DARKBLUE)
         self.end_screen_rect: Rect = self.end_screen.get_rect()
         self.end_screen_rect.center = (gs.screen_width//2,
                                        gs.screen_height//2)
 
         # game over
-        game_over_font: Font = pygame.font.Font("assets/fonts/gameboy.ttf",
-                                                40)
+        game_over_font: Font = assets.font(gs.FONT_PATH, 40)
         
-        self.over_text: Surface = game_over_font.render("GAME OVER", 
-                                                             True,
-                                                             gs.WHITE)
+        self.over_text: Surface = assets.text(game_over_font, "GAME OVER",
+                                              True, gs.WHITE)
         self.over_rect: Rect = self.over_text.get_rect()
         self.over_rect.center = (gs.screen_width//2+5, 150)
 
         # buttons
-        self.again_image: Surface = self.options_font.render("PLAY AGAIN",
-                                                             True,
-                                                             gs.WHITE) 
+        self.again_image: Surface = assets.text(self.options_font,
+                                                "PLAY AGAIN", True, gs.WHITE)
         self.again_rect: Rect = self.again_image.get_rect()  
         self.again_rect.center = (gs.screen_width//2,
                                   300)
     
-        self.again_alt_image: Surface = self.options_font.render("-PLAY AGAIN-",
-                                                                 True,
-                                                                 gs.WHITE)
+        self.again_alt_image: Surface = assets.text(self.options_font,
+                                                    "-PLAY AGAIN-", True,
+                                                    gs.WHITE)
         self.again_alt_rect: Rect = self.again_alt_image.get_rect()
         self.again_alt_rect.center = (gs.screen_width//2,
                                       300)
         
 
-        self.main_image: Surface = self.options_font.render("MAIN MENU",
-                                                            True, gs.WHITE)
+        self.main_image: Surface = assets.text(self.options_font, "MAIN MENU",
+                                               True, gs.WHITE)
         self.main_rect: Rect = self.main_image.get_rect()
         self.main_rect.center = (gs.screen_width//2,
                                  350)
         
-        self.main_alt_image: Surface = self.options_font.render("-MAIN MENU-",
-                                                                True, gs.WHITE)
+        self.main_alt_image: Surface = assets.text(self.options_font,
+                                                   "-MAIN MENU-", True,
+                                                   gs.WHITE)
         self.main_alt_rect: Rect = self.main_alt_image.get_rect()
         self.main_alt_rect.center = (gs.screen_width//2, 
                                      350)
 
+        self.end_targets: ClickTargets = \
+            ClickTargets([(self.again_alt_rect, self.play_again),
+                          (self.main_alt_rect, self.return_to_menu)])
+
     
     def display_end_screen(self) -> None:
         """
         Display the game over screen.
         """
-        self.end_screen.fill(gs.DARKBLUE)
         self.screen.blit(self.end_screen, self.end_screen_rect)
 
-        self.score_image: Surface = self.options_font\
-                                    .render(f"Score:{self.final_score}",
-                                            True, gs.WHITE)
+        self.score_image: Surface = assets.text(self.options_font,
+                                                f"Score:{self.final_score}",
+                                                True, gs.WHITE)
         self.score_rect: Rect = self.score_image.get_rect()
         self.score_rect.center = (gs.screen_width//2, 200)
 
         self.screen.blit(self.score_image, self.score_rect)
         self.screen.blit(self.over_text, self.over_rect)
+
+        # the game just played may not be written yet
+        best: int = max(leaderboard.snapshot.best, self.final_score)
+        best_image: Surface = assets.text(self.options_font, f"Best:{best}",
+                                          True, gs.WHITE)
+        self.screen.blit(best_image,
+                         best_image.get_rect(center=(gs.screen_width//2,
+                                                     235)))
         
-        pos: tuple[int,int] = pygame.mouse.get_pos()
-        if self.again_rect.collidepoint(pos):
+        if self.hovered == 0:
             self.screen.blit(self.again_alt_image, self.again_alt_rect)
         else:
             self.screen.blit(self.again_image, self.again_rect)
 
-        if self.main_rect.collidepoint(pos):
+        if self.hovered == 1:
             self.screen.blit(self.main_alt_image, self.main_alt_rect)
         else:
             self.screen.blit(self.main_image, self.main_rect)
@@ -248,66 +653,65 @@ class Tetris:
         # main background surface
         self.pause_screen: Surface = Surface((gs.screen_width,
                                              gs.screen_height))
+        self.pause_screen.fill(gs.BLACK)
+        self.pause_screen.set_alpha(220)
         
         self.pause_screen_rect: Rect = self.pause_screen.get_rect()
         self.pause_screen_rect.center = (gs.screen_width//2,
                                          gs.screen_height//2)
         
         # pause font
-        pause_font: Font = pygame.font\
-                            .Font("assets/fonts/gameboy.ttf", 50)
+        pause_font: Font = assets.font(gs.FONT_PATH, 50)
         
-        self.pause_text_image: Surface = pause_font\
-                        .render("PAUSED", True, gs.WHITE)
+        self.pause_text_image: Surface = assets.text(pause_font, "PAUSED",
+                                                     True, gs.WHITE)
         self.pause_text_rect: Rect = self.pause_text_image.get_rect()
         self.pause_text_rect.center = (gs.screen_width//2+10, 200)
         
         # options text
-        self.options_font: Font = pygame.font\
-                            .Font("assets/fonts/gameboy.ttf", 20)
+        self.options_font: Font = assets.font(gs.FONT_PATH, 20)
         
         ## resume
-        self.resume_image: Surface = self.options_font.render("RESUME", True,
-                                                              gs.WHITE)
+        self.resume_image: Surface = assets.text(self.options_font, "RESUME",
+                                                 True, gs.WHITE)
         self.resume_rect: Rect = self.resume_image.get_rect()
         self.resume_rect.center = (gs.screen_width//2, 270)
 
-        self.resume_alt_image: Surface = self.options_font.render("-RESUME-",
-                                                                  True,
-                                                                  gs.WHITE)
+        self.resume_alt_image: Surface = assets.text(self.options_font,
+                                                     "-RESUME-", True,
+                                                     gs.WHITE)
         self.resume_alt_rect: Rect = self.resume_alt_image.get_rect()
         self.resume_alt_rect.center = (gs.screen_width//2, 270)
 
         # menu
-        self.menu_image: Surface = self.options_font.render("MENU", True,
-                                                            gs.WHITE)
+        self.menu_image: Surface = assets.text(self.options_font, "MENU", True,
+                                               gs.WHITE)
         self.menu_rect: Rect = self.menu_image.get_rect()
         self.menu_rect.center = (gs.screen_width//2, 320)
 
-        self.menu_alt_image: Surface = self.options_font.render("-MENU-", 
-                                                                True,
-                                                                gs.WHITE)
+        self.menu_alt_image: Surface = assets.text(self.options_font, "-MENU-",
+                                                   True, gs.WHITE)
         self.menu_alt_rect: Rect = self.menu_alt_image.get_rect()
         self.menu_alt_rect.center = (gs.screen_width//2, 320)
+
+        self.pause_targets: ClickTargets = \
+            ClickTargets([(self.resume_alt_rect, self.resume),
+                          (self.menu_alt_rect, self.quit_to_menu)])
         
 
     def display_pause_screen(self) -> None:
         """
         Display the pause screen.
         """
-        self.pause_screen.fill(gs.BLACK)
-        self.pause_screen.set_alpha(220)
-
         self.screen.blit(self.pause_screen, self.pause_screen_rect)
         self.screen.blit(self.pause_text_image, self.pause_text_rect)
 
-        pos: tuple[int,int] = pygame.mouse.get_pos()
-        if self.resume_rect.collidepoint(pos):
+        if self.hovered == 0:
             self.screen.blit(self.resume_alt_image, self.resume_alt_rect)
         else:
             self.screen.blit(self.resume_image, self.resume_rect)
 
-        if self.menu_rect.collidepoint(pos):
+        if self.hovered == 1:
             self.screen.blit(self.menu_alt_image, self.menu_alt_rect)
         else:
             self.screen.blit(self.menu_image, self.menu_rect)
@@ -315,300 +719,105 @@ class Tetris:
 
     def display_next_block(self) -> None:
         """
-        Display the next block.
+        Display the next block inside the box drawn on the background.
         """
-        # display 'next' text
-        next_text_image: Surface = self.ui_font.render("NEXT", True, gs.WHITE)
-        next_text_rect: Rect = next_text_image.get_rect(center=(317, 80))
-        self.screen.blit(next_text_image, next_text_rect)
-
-        # draw bounding box around the block
-        next_rect: Rect = Rect(0,0, 100, 100)
-        next_rect.center = (315, 150)
-
-        pygame.draw.rect(self.screen, gs.WHITE, next_rect, 2, 7)
-
-        # draw the appropriate tetronimo
-        next_image: Surface = pygame.image\
-                    .load(f"assets/game/{self.next_tetronimo.shape}.png")
+        next_image: Surface = \
+            assets.image(f"assets/game/{self.engine.next_piece.shape}.png")
         next_image_rect: Rect = next_image.get_rect(center=(315,150))
         self.screen.blit(next_image, next_image_rect)
 
     
     def display_score(self) -> None:
         """
-        Display the current score.
+        Display the current score inside the box drawn on the background.
         """
-        # display 'score' text
-        score_text_image: Surface = self.ui_font.render("SCORE", True,
-                                                        gs.WHITE)
-        score_text_rect: Rect = score_text_image.get_rect(center=(317, 305))
-        self.screen.blit(score_text_image, score_text_rect)
-
-        # draw bounding rectangle
-        score_rect: Rect = Rect(0,0, 120, 70)
-        score_rect.center = (315, 360)
-
-        pygame.draw.rect(self.screen, gs.WHITE, score_rect, 2, 7)
-
-        # display score
-        score_image: Surface = self.ui_font.render(f"{self.score:03d}", True,
-                                                   gs.WHITE)
+        score_image: Surface = assets.text(self.ui_font, f"{self.score:03d}",
+                                           True, gs.WHITE)
         score_rect: Rect = score_image.get_rect(center=(315, 360))
         self.screen.blit(score_image, score_rect)
                 
 
-    def put_blocks_in_array(self) -> None:
+    def rebuild_stack(self) -> None:
         """
-        Store the location of landed blocks in the field array to track
-        collisions with other blocks.
+        Redraw the landed blocks onto the stack surface from scratch. This is
+        only needed when rows are cleared and the stack shifts down.
         """
-        for block in self.tetromino.blocks:
-            x,y = int(block.pos.x), int(block.pos.y)
-            self.field_array[x][y] = block
+        self.stack.blit(self.background, (0,0), self.field_rect)
 
+        board: Board = self.engine.board
+        for row, mask in enumerate(board.rows):
+            if not mask:
+                continue
+            for col in range(board.width):
+                if mask >> col & 1:
+                    self.stack.blit(self.block_image, (col * gs.tile_size,
+                                                       row * gs.tile_size))
 
-    def get_field_array(self) -> None:
-        """
-        Create a two-dimensional array to store the status of cells on the
-        grid.
-        """
-        return [[0 for _ in range(gs.grid_height)]
-                for _ in range(gs.grid_width)]
 
-                
-    def set_timer(self) -> None:
-        """
-        Create a user event to handle the movement of the blocks. 
+    def update_stack(self, result: StepResult) -> None:
         """
-        self.user_event: int = pygame.USEREVENT + 0
-        pygame.time.set_timer(self.user_event, gs.TIME_INTERVAL)   
+        Add the blocks of a piece that just locked to the stack surface.
 
-
-    def check_tetronimo_landed(self) -> None:
-        """
-        Store the blocks of a tetronimo in the field array and load a new one
-        when it has landed.
+        :param result: the engine step that locked the piece.
         """
-        if self.tetromino.landed:
-            if self.is_game_over():
-                self.final_score = self.score
-                self.game_over = True
-                self.display_end_screen()
-            else:
-                self.score += 10
-                self.audio_handler.landed.play()
-                pygame.time.set_timer(self.user_event, gs.TIME_INTERVAL)
-                self.put_blocks_in_array()
-                self.next_tetronimo.current = True
-                self.tetromino = self.next_tetronimo
-                self.next_tetronimo = Tetronimo(self.screen,
-                                                self.block_group, self, False)
+        # cleared lines and rising garbage shift the whole stack
+        if result.lines_cleared or self.engine.garbage_raised:
+            self.rebuild_stack()
+            return
 
+        for x,y in self.engine.locked_cells:
+            self.stack.blit(self.block_image, (x * gs.tile_size,
+                                               y * gs.tile_size))
 
-    def check_full_lines(self) -> None:
-        """
-        Check for any completed rows.
-        """
-        row: int = gs.grid_height - 1
 
-        for cell in range(gs.grid_height-1, -1, -1):
-            current_line: list = []
-            for line in range(gs.grid_width):
-                current_line.append(self.field_array[line][cell])
-                self.field_array[line][row] = self.field_array[line][cell]
-
-                if self.field_array[line][cell]:
-                    self.field_array[line][row].pos = Vector2(line, cell)
-            
-            if all(current_line):
-                self.audio_handler.full_line.play()
-                self.score += 100
-                for block in current_line:
-                    block.alive = False
-                    block = 0
-            else:
-                row -= 1
-
-
-    def is_game_over(self) -> bool:
+    def get_piece_rect(self) -> Rect:
         """
-        Check when the game is over.
+        Return the screen area covered by the visible part of the falling
+        piece.
 
-        :return: True -> game over, False -> not game over.
+        :return: the bounding rectangle, empty if the piece is above the grid.
         """
-        if self.tetromino.blocks[0].pos.y == gs.initial_offset[1]:
-            return True
+        cells: list[tuple[int,int]] = [(x,y) for x,y
+                                       in self.engine.piece.cells() if y >= 0]
+        if not cells:
+            return Rect(0,0, 0,0)
+
+        min_x: int = min(x for x,_ in cells)
+        min_y: int = min(y for _,y in cells)
+        return Rect(min_x * gs.tile_size + gs.grid_start_x,
+                    min_y * gs.tile_size + gs.grid_start_y,
+                    (max(x for x,_ in cells) - min_x + 1) * gs.tile_size,
+                    (max(y for _,y in cells) - min_y + 1) * gs.tile_size)
 
 
 ### PIECE CLASS ####
 class Tetronimo:
-    """Represents an instance of a tetronimo"""
-    def __init__(self, screen: Surface, block_group: Group,
-                 tetris: Tetris, current: bool=True) -> None:
-        """
-        Initializes a tetronimo object.
-
-        :param screen: the game screen.
-        :param block_group: a sprite group containing all the blocks of
-        the tetronimo.
-        :param tetris: the game instance this tetronimo belongs to.
-        :param current: whether this tetronimo object is in play.
-        """
-        self.tetris: Tetris = tetris
-
-        self.screen: Surface = screen
-        self.block_group: Group = block_group
-        
-        self.shape: str = rng.choice(list(gs.TETROMINOES))
-        self.blocks: list[Block] = [Block(self.screen, pos, self.block_group,
-                                          self) 
-                                    for pos in gs.TETROMINOES[self.shape]]
-        
-        self.landed: bool = False
-        self.current: bool = current
-        
-
-    def move(self, direction: str) -> None:
-        """
-        Move the tetronimo one place in a given direction.
-
-        :param direction: the direction to move 
-        """
-        move_direction: Vector2 = gs.MOVE_DIRECTIONS[direction.lower()]
-
-        new_block_positions = [block.pos + move_direction for block in self.blocks]
-        is_collide: bool = self.is_collide(new_block_positions)
-
-        if not self.landed:
-            if not is_collide:
-                for block in self.blocks:
-                    block.pos += move_direction
-            elif direction == 'down':
-                self.landed =  True
-
+    """
+    Represents the on-screen view of the falling piece. It holds no
+    per-block objects: the cells are read from the engine piece and each
+    one is drawn with the same shared tile image.
+    """
+    __slots__ = ("screen", "tile", "piece")
 
-    def update(self) -> None:
+    def __init__(self, screen: Surface, tile: Surface, piece: Piece) -> None:
         """
-        Move the tetronimo down.
-        """
-        self.move('down')
-
-
-    def rotate(self) -> None:
-        """
-        Rotate the tetronimo by 90 degrees.
-        """
-        if self.shape == "O":
-            return 
-        
-        pivot_pos: Vector2 = self.blocks[0].pos
-        new_block_positions: list[Vector2] = [block.rotate(pivot_pos)
-                                              for block in self.blocks]
-
-        if not self.is_collide(new_block_positions):
-            for idx, block in enumerate(self.blocks):
-                block.pos = new_block_positions[idx]
-
-
-    def is_collide(self, block_positions: list[Vector2]) -> bool:
-        """
-        Check if the tetronimo has collided with anything.
-
-        :param block_positions: the positions of all blocks in the tetronimo.
-        :return: whether any blocks have collided.
-        """
-        return any(map(Block.is_collide, self.blocks, block_positions))
-
-
-
-### INDIVIDUAL BLOCK CLASS ###
-class Block(Sprite):
-    """Represents an instance of a single block."""
-    def __init__(self, screen: Surface, position: tuple[int,int],
-                 block_group: Group, tetronimo: Tetronimo) -> None:
-        """
-        Initialize a block object.
+        Initializes a tetronimo object.
 
         :param screen: the game screen.
-        :param position: the top left x and y grid coordinates.
-        :param block_group: a sprite group containing all the blocks in a 
-        specific tetronimo.
-        :param tetronimo: the tetronimo object this block belongs to. 
+        :param tile: the image drawn for every block.
+        :param piece: the engine piece this tetronimo displays.
         """
-        super().__init__()
         self.screen: Surface = screen
+        self.tile: Surface = tile
+        self.piece: Piece = piece
 
-        self.tetronimo: Tetronimo = tetronimo
-
-        self.block_group: Group = block_group
-        self.block_group.add(self)
-
-        self.pos: Vector2 = Vector2(position) + gs.initial_offset
-        self.next_pos: Vector2 = Vector2(position) + \
-            gs.next_block_display_offset
-
-        self.image: Surface = pygame.image.load("assets/game/block.png")
-
-        self.rect: Rect = self.image.get_rect()
-
-        self.alive: bool = True
-        
-
-    def update(self) -> None:
-        """
-        Update the position of the block and draw it to the screen
-        """
-        self.set_block_position()
-        self.is_alive()
-
-
-    def set_block_position(self) -> None:
-        """
-        Set the position of the rect.
-        """
-        pos: Vector2 = [self.next_pos, self.pos][self.tetronimo.current]
-        self.rect.topleft = pos * gs.tile_size + \
-                            Vector2(gs.grid_start_x, gs.grid_start_y)
-
-
-    def rotate(self, pivot_pos: Vector2) -> None:
-        """
-        Rotate the block by 90 degrees.
-
-        :param pivot_pos: the axis around which the block is rotated.
-        """
-        translated: Vector2 = self.pos - pivot_pos
-        rotated: Vector2 = translated.rotate(90.0)
-        return rotated + pivot_pos
-
-
-    def draw_block(self) -> None:
-        """
-        Draw the block to the screen.
-        """
-        if self.rect.top >= gs.grid_start_y:
-            self.screen.blit(self.image, self.rect)
-
-
-    def is_collide(self, position: Vector2) -> bool:
-        """
-        Check whether a block has collided with the sides of the grid
-        or other blocks.
-
-        :param position: the position of the block.
-        :return: whether the block has collided.
-        """
-        x,y = int(position.x), int(position.y)
-        if 0 <= x < gs.grid_width and y < gs.grid_height and \
-            (y < 0 or not self.tetronimo.tetris.field_array[x][y]):
-            return False
-        return True
-    
 
-    def is_alive(self) -> None:
+    def draw(self) -> None:
         """
-        Check if th block has been removed from the grid.
+        Draw the blocks of the piece that are inside the grid.
         """
-        if not self.alive:
-            self.kill()
\ No newline at end of file
+        blit = self.screen.blit
+        for x,y in self.piece.cells():
+            if y >= 0:
+                blit(self.tile, (x * gs.tile_size + gs.grid_start_x,
+                                 y * gs.tile_size + gs.grid_start_y))
@@ -1,4 +1,6 @@
 import sys
+from typing import Callable
+
 import pygame
 from pygame import Surface, Rect
 from pygame.event import Event
@@ -7,12 +9,18 @@ from pygame.font import Font
 import game_settings as gs
 from state_manager import StateManager
 from audio_handler import AudioHandler
+from asset_cache import assets
+from input_handler import hit_test
+from leaderboard import Snapshot, leaderboard
 
 from button import Button
 
 
 class MainMenu:
     """Represents the main menu state."""
+    # the state the menu usually hands over to, built in the background
+    next_state: str = "main_game"
+
     def __init__(self, screen: Surface, state_manager: StateManager,
                  audio_handler: AudioHandler) -> None:
         """
@@ -26,8 +34,8 @@ class MainMenu:
         self.audio_handler: AudioHandler = audio_handler
 
         # main menu bg
-        self.background: Surface = pygame.image\
-            .load("assets/ui/main_menu_bg.png")
+        self.background: Surface = assets.image("assets/ui/main_menu_bg.png",
+                                                False)
 
         # main menu buttons
         self.start_button: Button = Button(screen, gs.screen_width//2, 290,
@@ -40,13 +48,38 @@ class MainMenu:
                                           "assets/ui/exit_H.png", 0.7,
                                           self.audio_handler.pause_click)
         
-        self.credits: Font = pygame.font.Font("assets/fonts/gameboy.ttf", 12)
+        self.credits: Font = assets.font(gs.FONT_PATH, 12)
+
+        self.buttons: list[Button] = [self.start_button, self.quit_button]
+        self.button_rects: list[Rect] = [button.rect for button
+                                         in self.buttons]
+        self.button_actions: list[Callable[[], None]] = [self.start_game,
+                                                         sys.exit]
+
+        # handlers keyed by event type, other events are ignored
+        self.event_handlers: dict[int, Callable[[Event], None]] = \
+            {pygame.MOUSEMOTION: self.mouse_motion,
+             pygame.MOUSEBUTTONDOWN: self.mouse_down,
+             pygame.MOUSEBUTTONUP: self.mouse_up,
+             pygame.KEYDOWN: self.key_down}
 
-    
-    def run(self) -> None:
+        # the menu is only drawn again when a button's hover image or the
+        # high scores change
+        self.redraw: bool = True
+        self.hovered: int = -1
+        self.scores: Snapshot | None = None
+
+
+    def run(self) -> list[Rect] | None:
         """
         Run the menu screen.
+
+        :return: the areas of the screen that changed, None -> all of it.
         """
+        if not self.redraw and self.scores is leaderboard.snapshot:
+            return []
+        self.redraw = False
+
         self.screen.blit(self.background, (0,0))
 
         self.draw_logo(gs.screen_width//2 - 3, 180)
@@ -55,21 +88,106 @@ class MainMenu:
         self.quit_button.draw_button()
 
         self.draw_credits()
+        self.draw_scores()
+        return None
+
+
+    def is_idle(self) -> bool:
+        """
+        Check whether the menu can wait for input instead of running frames.
+
+        :return: always True, the menu only changes on input.
+        """
+        return True
+
+
+    def tick(self) -> None:
+        """
+        Advance the menu by one logic tick. The menu has no simulation.
+        """
+
+
+    def enter(self) -> None:
+        """
+        Called when the menu becomes the current state.
+        """
+        self.reset()
+
+
+    def exit(self) -> None:
+        """
+        Called when another state replaces the menu.
+        """
+
 
-    def handle_events(self, event: Event) -> None:
+    def reset(self) -> None:
         """
-        Handle user input.
+        Forget any button press left over from the last visit.
+        """
+        for button in self.buttons:
+            button.button_clicked = False
+            button.hovered = False
+        self.redraw = True
+        self.hovered = -1
+
+
+    def mouse_motion(self, event: Event) -> None:
+        """
+        Redraw the menu when the mouse moves onto or off a button.
+
+        :param event: the mouse motion event.
+        """
+        hovered: int = hit_test(event.pos, self.button_rects)
+        if hovered != self.hovered:
+            self.hovered = hovered
+            for index, button in enumerate(self.buttons):
+                button.hovered = index == hovered
+            self.redraw = True
+
+
+    def mouse_down(self, event: Event) -> None:
+        """
+        Press the button under the mouse, if any.
+
+        :param event: the mouse button event.
+        """
+        if event.button != 1:
+            return
+        index: int = hit_test(event.pos, self.button_rects)
+        if index != -1:
+            self.buttons[index].press()
+
+
+    def mouse_up(self, event: Event) -> None:
+        """
+        Release the pressed button, running its action if the mouse is still
+        over it.
 
-        :param event: the given user event.
+        :param event: the mouse button event.
         """
-        if self.start_button.clicked():
-            self.game_class = self.state_manager.get_state("main_game")
-            self.state_manager.set_state(self.game_class(self.screen,
-                                                         self.state_manager,
-                                                         self.audio_handler))
+        if event.button != 1:
+            return
+        for button, action in zip(self.buttons, self.button_actions):
+            if button.release(event.pos):
+                action()
+
 
-        if self.quit_button.clicked():
-            sys.exit()
+    def key_down(self, event: Event) -> None:
+        """
+        Start a versus game when V is pressed.
+
+        :param event: the key event.
+        """
+        if event.key == pygame.K_v:
+            self.audio_handler.pause_click.play()
+            self.state_manager.change_state("versus_game")
+
+
+    def start_game(self) -> None:
+        """
+        Switch to a new game.
+        """
+        self.state_manager.change_state("main_game")
 
 
     def draw_logo(self, x: int, y: int) -> None:
@@ -79,7 +197,7 @@ class MainMenu:
         :param x: the center x position.
         :param y: the center y position.
         """
-        self.logo_image: Surface = pygame.image.load("assets/ui/logo.png")
+        self.logo_image: Surface = assets.image("assets/ui/logo.png")
         self.logo_rect: Rect = self.logo_image.get_rect(center=(x,y))
         self.screen.blit(self.logo_image, self.logo_rect)
 
@@ -88,11 +206,31 @@ class MainMenu:
         """
         Render the credits on the screen.
         """
-        image: Surface = self.credits.render("A.AMARIKWA", True,
-                                             gs.WHITE)
+        image: Surface = assets.text(self.credits, "A.AMARIKWA", True,
+                                     gs.WHITE)
         rect: Rect = image.get_rect()
         rect.centerx = gs.screen_width//2
         rect.centery = gs.screen_height - 105
 
         self.screen.blit(image, rect)
-            
\ No newline at end of file
+
+        hint: Surface = assets.text(self.credits, "V - VERSUS", True,
+                                    gs.WHITE)
+        self.screen.blit(hint, hint.get_rect(centerx=gs.screen_width//2,
+                                             centery=gs.screen_height - 85))
+            
+
+    def draw_scores(self) -> None:
+        """
+        Render the top scores from the latest leaderboard snapshot.
+        """
+        self.scores = leaderboard.snapshot
+        for rank, entry in enumerate(self.scores.top, 1):
+            image: Surface = assets.text(self.credits,
+                                         f"{rank}. {entry.score:06d} "
+                                         f"{entry.player}", True, gs.WHITE)
+            rect: Rect = image.get_rect()
+            rect.centerx = gs.screen_width//2
+            rect.centery = gs.screen_height - 70 + rank * 15
+
+            self.screen.blit(image, rect)
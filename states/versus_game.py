@@ -0,0 +1,215 @@
+import random
+
+import pygame
+from pygame import Surface, Rect
+from pygame.font import Font
+
+import game_settings as gs
+from state_manager import StateManager
+from audio_handler import AudioHandler
+from asset_cache import assets
+from network import VersusLink
+from engine.sync import BoardSync
+from engine.rules import StepResult
+from states.main_game import Tetris
+
+
+class VersusGame(Tetris):
+    """
+    Represents a game against another process over the network. Each tick
+    the local game is sent as a board delta and the other player's packets
+    are applied: their board is shown in miniature under the next box, and
+    the garbage they send rises on the next lock that clears nothing. The
+    first player to top out loses.
+    """
+    # the other player cannot be rewound with us
+    allow_rewind: bool = False
+
+    def __init__(self, screen: Surface, state_manager: StateManager,
+                 audio_handler: AudioHandler) -> None:
+        """
+        Initialize an instance of the versus game scene.
+
+        :param screen: the game screen.
+        :param state_manager: a reference to the state manager.
+        """
+        self.link: VersusLink | None = None
+        self.sync: BoardSync | None = None
+        super().__init__(screen, state_manager, audio_handler)
+
+        self.remote_rect: Rect = Rect(0,0, gs.grid_width * gs.REMOTE_TILE,
+                                      gs.grid_height * gs.REMOTE_TILE)
+        self.remote_rect.center = (315, 245)
+        self.remote_tile: Surface = pygame.transform.scale(
+            self.block_image, (gs.REMOTE_TILE, gs.REMOTE_TILE))
+
+        result_font: Font = assets.font(gs.FONT_PATH, 20)
+        self.win_text: Surface = assets.text(result_font, "YOU WIN", True,
+                                             gs.WHITE)
+        self.lose_text: Surface = assets.text(result_font, "YOU LOSE", True,
+                                              gs.WHITE)
+
+
+    def reset(self) -> None:
+        """
+        Start a new game and a new board sync under a new match id. Packets
+        the other player sent in earlier matches may still arrive, so the
+        ids of their games are carried over to be dropped.
+        """
+        super().reset()
+        # garbage from the network is not in the replay, so it could not
+        # be played back and must not replace the last real one
+        self.recording = False
+
+        ended: set[int] = set()
+        if self.sync is not None:
+            ended = self.sync.ended
+            if self.sync.remote_match:
+                ended.add(self.sync.remote_match)
+        self.sync = BoardSync(random.randrange(1, 1 << 32), ended)
+        self.won: bool = False
+        self.remote_changed: bool = True
+
+        # the first packet that reported the result, and the ticks spent
+        # resending it since
+        self.final_seq: int = 0
+        self.linger: int = 0
+
+        # garbage holes are picked from the game's own seed
+        self.holes: random.Random = random.Random(self.engine.generator.seed)
+
+
+    def enter(self) -> None:
+        """
+        Called when the game becomes the current state. Opens the link, the
+        game is played alone if no port is free.
+        """
+        super().enter()
+        try:
+            self.link = VersusLink()
+        except OSError:
+            self.link = None
+
+
+    def exit(self) -> None:
+        """
+        Called when another state replaces the game.
+        """
+        super().exit()
+        if self.link is not None:
+            self.link.close()
+            self.link = None
+
+
+    def is_idle(self) -> bool:
+        """
+        Check whether the game can wait for input instead of running frames.
+        Pausing does not stop the sync, and a finished game keeps sending
+        until the other player has seen the result, or gs.VERSUS_LINGER
+        ticks have passed.
+
+        :return: True -> over and acknowledged, False -> still syncing or
+        particles are still moving.
+        """
+        return self.game_over and not self.effects.count and \
+            (self.link is None or
+             self.sync.acked >= self.final_seq > 0 or
+             self.linger >= gs.VERSUS_LINGER)
+
+
+    def tick(self) -> None:
+        """
+        Advance the local game by one logic tick, then exchange packets
+        with the other player.
+        """
+        super().tick()
+        if self.link is None:
+            return
+
+        remote_seq: int = self.sync.remote_seq
+        for data in self.link.receive():
+            for lines, hole in self.sync.decode(data):
+                self.engine.receive_garbage(lines, hole)
+        if self.sync.remote_seq != remote_seq:
+            self.remote_changed = True
+
+        if self.sync.remote_over and not self.game_over:
+            self.won = True
+            self.end_game()
+
+        if self.game_over:
+            if not self.final_seq:
+                self.final_seq = self.sync.seq + 1
+            self.linger += 1
+        self.link.send(self.sync.encode(self.engine))
+
+
+    def handle_result(self, result: StepResult) -> None:
+        """
+        React to the outcome of an engine tick, sending the garbage of a
+        lock to the other player.
+
+        :param result: the result reported by the engine.
+        """
+        super().handle_result(result)
+        if result.locked and self.engine.garbage_sent:
+            self.sync.attack(self.engine.garbage_sent,
+                             self.holes.randrange(gs.grid_width))
+
+
+    def run(self) -> list[Rect] | None:
+        """
+        Run the versus game state.
+
+        :return: the areas of the screen that changed, None -> all of it.
+        """
+        dirty: list[Rect] | None = super().run()
+        if dirty is None or not self.remote_changed or self.game_over or \
+                self.game_paused:
+            return dirty
+
+        self.draw_remote()
+        return dirty + [self.remote_rect]
+
+
+    def draw_frame(self) -> None:
+        """
+        Draw the background, ui, both boards and the falling piece.
+        """
+        super().draw_frame()
+        self.draw_remote()
+
+
+    def draw_remote(self) -> None:
+        """
+        Draw the other player's board and falling piece in miniature.
+        """
+        self.remote_changed = False
+        self.screen.fill(gs.BLACK, self.remote_rect)
+
+        blit = self.screen.blit
+        tile: int = gs.REMOTE_TILE
+        left: int = self.remote_rect.x
+        top: int = self.remote_rect.y
+        for row, mask in enumerate(self.sync.rows):
+            if not mask:
+                continue
+            for col in range(gs.grid_width):
+                if mask >> col & 1:
+                    blit(self.remote_tile, (left + col * tile,
+                                            top + row * tile))
+        for x,y in self.sync.piece_cells():
+            if y >= 0:
+                blit(self.remote_tile, (left + x * tile, top + y * tile))
+
+
+    def display_end_screen(self) -> None:
+        """
+        Display the game over screen with the result of the match.
+        """
+        super().display_end_screen()
+        if self.link is None:
+            return
+        text: Surface = self.win_text if self.won else self.lose_text
+        self.screen.blit(text, text.get_rect(center=(gs.screen_width//2,
+                                                      100)))